@@ -0,0 +1,46 @@
+"""
+压缩点阵与原始点阵的读取耗时对比测试
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    16x16ForDemos.v4.bmf  (python tools/bmf_tool.py convert 16x16ForDemos.bmf 16x16ForDemos.v4.bmf)
+    16x16ForDemos.v4z.bmf (python tools/bmf_tool.py convert 16x16ForDemos.bmf 16x16ForDemos.v4z.bmf --compress)
+测试内容:
+    字体文件大小、单个字符获取点阵的平均耗时(原始点阵为一次 readinto，压缩点阵还包含解码)
+"""
+
+import os
+import time
+
+import ufont
+
+RAW_FONT = "16x16ForDemos.v4.bmf"
+COMPRESSED_FONT = "16x16ForDemos.v4z.bmf"
+TEST_STRING = "他日若遂凌云志，敢笑黄巢不丈夫! MicroPython 你好"
+ROUNDS = 20
+
+ufont.DEBUG = False
+
+
+def measure(font_file, **kwargs):
+    font = ufont.BMFont(font_file, **kwargs)
+    buff = bytearray(font.bitmap_size)
+    codes = [ord(c) for c in TEST_STRING]
+    t = time.ticks_us()
+    for _ in range(ROUNDS):
+        for code in codes:
+            font.fast_get_bitmap(code, buff)
+    delta = time.ticks_diff(time.ticks_us(), t)
+    font.close_file()
+    return delta / (ROUNDS * len(codes))
+
+
+for font_file in (RAW_FONT, COMPRESSED_FONT):
+    print(
+        "{}: {} Byte, 每字 {:.1f}us, 内存索引 每字 {:.1f}us".format(
+            font_file,
+            os.stat(font_file)[6],
+            measure(font_file),
+            measure(font_file, enable_mem_index=True),
+        )
+    )
@@ -0,0 +1,61 @@
+"""
+ST7789 局部刷新的耗时测试
+Micropython版本: 1.19.1
+演示硬件:
+    ST7789 240x240 LCD
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+    drivers/st77xx.py
+测试内容:
+    模拟仪表盘每帧更新几个数字，分别测试整屏 show() 与只发送 text() 改动区域的 show_dirty() 的耗时和发送的字节数
+"""
+
+import random
+import time
+
+from machine import SPI, Pin
+
+import ufont
+from drivers.st77xx import ST7789
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+FRAMES = 20
+# (x, y) 每帧更新的数字位置
+LABELS = ((0, 0), (120, 0), (0, 112), (120, 224))
+
+# 请修改为对应引脚
+spi = SPI(1, 40000000, sck=Pin(2), mosi=Pin(3), polarity=1)
+display = ST7789(spi, rst=10, dc=6, cs=7, bl=11, width=240, height=240, rotate=0)
+
+ufont.DEBUG = False
+font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+
+
+def draw_labels():
+    for x, y in LABELS:
+        bbox = font.text(display, "{:5.1f}".format(random.random() * 100), x, y, show=False)
+        display.mark_dirty(*bbox)
+
+
+t = time.ticks_us()
+for _ in range(FRAMES):
+    draw_labels()
+    display.show()
+full_us = time.ticks_diff(time.ticks_us(), t) / FRAMES
+full_bytes = len(display.buffer)
+
+sent = 0
+t = time.ticks_us()
+for _ in range(FRAMES):
+    draw_labels()
+    sent += display.show_dirty()
+dirty_us = time.ticks_diff(time.ticks_us(), t) / FRAMES
+
+print(
+    "每帧: show() {:.1f}ms {} Byte, show_dirty() {:.1f}ms {} Byte".format(
+        full_us / 1000, full_bytes, dirty_us / 1000, sent // FRAMES
+    )
+)
+
+font.close_file()
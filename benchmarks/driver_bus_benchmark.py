@@ -0,0 +1,162 @@
+"""
+显示驱动命令通道的总线事务与内存分配测试
+Micropython版本: 1.19.1 (unix 端口)
+所需文件:
+    drivers/st77xx.py
+    drivers/st7735.py
+    drivers/ssd1306.py
+    drivers/e1in54.py
+测试内容:
+    用模拟的 Pin/SPI/I2C 代替硬件，统计各驱动每次刷新的片选(I2C 为传输)次数、write 次数、发送的字节数，
+    以及关闭 gc 后由 gc.mem_alloc() 得到的内存分配量
+    不需要连接屏幕，在仓库根目录运行: micropython benchmarks/driver_bus_benchmark.py
+"""
+
+import gc
+import sys
+
+FRAMES = 20
+
+
+class Pin:
+    """记录片选下降沿次数的模拟引脚"""
+    OUT = 1
+    IN = 0
+    PULL_UP = 2
+    PULL_DOWN = 3
+
+    def __init__(self, id=None, mode=-1, pull=-1, value=0):
+        self.v = value
+        self.falls = 0
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if value is not None:
+            self(value)
+
+    def __call__(self, v=None):
+        if v is None:
+            return self.v
+        if self.v and not v:
+            self.falls += 1
+        self.v = v
+
+    def value(self, v=None):
+        return self(v)
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty=0):
+        pass
+
+    def duty(self, value=None):
+        pass
+
+    def duty_u16(self, value=None):
+        pass
+
+
+class machine:
+    Pin = Pin
+    PWM = PWM
+
+
+class MockBus:
+    """只计数不发送的 SPI/I2C"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.writes = 0
+        self.bytes = 0
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def write(self, buf):
+        self.writes += 1
+        self.bytes += len(buf)
+
+    def writeto(self, addr, buf):
+        self.transactions += 1
+        self.write(buf)
+
+    def writevto(self, addr, bufs):
+        self.transactions += 1
+        for buf in bufs:
+            self.write(buf)
+
+
+# 驱动在导入时使用模拟的 machine 模块
+sys.modules["machine"] = machine
+sys.path.append(".")
+
+from drivers import ssd1306  # noqa: E402
+from drivers.e1in54 import EPD  # noqa: E402
+from drivers.st7735 import ST7735  # noqa: E402
+from drivers.st77xx import ST7789  # noqa: E402
+
+
+def measure(name, bus, cs, refresh):
+    refresh()
+    bus.reset()
+    falls = cs.falls if cs is not None else 0
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    for _ in range(FRAMES):
+        refresh()
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    transactions = cs.falls - falls if cs is not None else bus.transactions
+    print("{:<22} 每次: 事务 {:>3}, write {:>4} 次, {:>6} Byte, 分配 {:>5} Byte".format(
+        name, transactions // FRAMES, bus.writes // FRAMES, bus.bytes // FRAMES, allocated // FRAMES))
+
+
+bus = MockBus()
+display = ST7789(bus, rst=1, dc=2, cs=3, width=240, height=240)
+measure("ST7789 show()", bus, display.cs, display.show)
+
+
+def st7789_dirty():
+    display.mark_dirty(8, 8, 64, 16)
+    display.show_dirty()
+
+
+measure("ST7789 show_dirty()", bus, display.cs, st7789_dirty)
+
+bus = MockBus()
+display = ST7735(bus, rst=1, dc=2, cs=3)
+measure("ST7735 show()", bus, display.cs, display.show)
+
+bus = MockBus()
+display = ssd1306.SSD1306_I2C(128, 64, bus)
+measure("SSD1306_I2C show()", bus, None, display.show)
+
+bus = MockBus()
+display = ssd1306.SSD1306_I2C(128, 64, bus, shadow=True)
+
+
+def ssd1306_changed():
+    display.pixel(64, 32, not display.pixel(64, 32))
+    display.show()
+
+
+measure("SSD1306_I2C shadow", bus, None, ssd1306_changed)
+
+bus = MockBus()
+cs = Pin(value=1)
+display = ssd1306.SSD1306_SPI(128, 64, bus, dc=Pin(), res=Pin(), cs=cs)
+measure("SSD1306_SPI show()", bus, cs, display.show)
+
+bus = MockBus()
+display = EPD(bus, cs=1, dc=2, rst=3, busy=4, partial=True, full_refresh_every=FRAMES * 2)
+
+
+def epd_partial():
+    display.pixel(100, 100, not display.pixel(100, 100))
+    display.show()
+
+
+measure("EPD partial show()", bus, display.cs, epd_partial)
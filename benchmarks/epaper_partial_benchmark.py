@@ -0,0 +1,45 @@
+"""
+1.54 寸墨水屏差异局部刷新的耗时测试
+Micropython版本: 1.19.1
+演示硬件:
+    1.54 寸 e-Paper(200x200)
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+    drivers/e1in54.py
+测试内容:
+    模拟时钟每次只改变几个数字，分别测试整屏刷新与 partial=True(只刷新变化区域)时 show() 的耗时和刷新的区域
+"""
+
+import time
+
+from machine import SPI, Pin
+
+import ufont
+from drivers.e1in54 import EPD
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+UPDATES = 6
+
+ufont.DEBUG = False
+font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+
+# 请修改为对应引脚
+spi = SPI(1, 30000000, sck=Pin(2), mosi=Pin(3))
+
+for partial in (False, True):
+    display = EPD(spi, cs=18, dc=12, rst=1, busy=19, partial=partial, full_refresh_every=UPDATES)
+    display.fill(1)
+    font.text(display, "当前时间", 8, 8, reverse=True, show=False)
+    display.show()
+    total_ms = 0
+    for minute in range(UPDATES):
+        font.text(display, "12:{:02d}".format(minute), 8, 64, font_size=32, reverse=True, show=False)
+        t = time.ticks_ms()
+        display.show()
+        delta = time.ticks_diff(time.ticks_ms(), t)
+        total_ms += delta
+        print("partial={}: show() {}ms, 区域 {}".format(partial, delta, display.last_region))
+    print("partial={}: 平均 {}ms".format(partial, total_ms // UPDATES))
+
+font.close_file()
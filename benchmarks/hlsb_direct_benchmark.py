@@ -0,0 +1,75 @@
+"""
+MONO_HLSB 帧缓存直接写入与 blit 的对比测试
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+测试内容:
+    在 200x200 的 MONO_HLSB 帧缓存(与 1.54 寸墨水屏相同)上写满文字，
+    分别测试 blit 与按行直接写入(x 按字节对齐)时 text() 的耗时，并比较两者的结果是否一致
+    不需要连接屏幕
+"""
+
+import time
+
+import framebuf
+
+import ufont
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+WIDTH = 200
+HEIGHT = 200
+TEXT = "风急天高猿啸哀渚清沙白鸟飞回无边落木萧萧下不尽长江滚滚来万里悲秋常作客百年多病独登台艰难苦恨繁霜鬓潦倒新停浊酒杯"
+
+ufont.DEBUG = False
+
+
+class Canvas(framebuf.FrameBuffer):
+    """只有帧缓存的显示对象，direct=True 时声明帧缓存格式以启用直接写入"""
+
+    def __init__(self, direct):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.buffer = bytearray(WIDTH * HEIGHT // 8)
+        if direct:
+            self.format = framebuf.MONO_HLSB
+        super().__init__(self.buffer, WIDTH, HEIGHT, framebuf.MONO_HLSB)
+
+    def show(self):
+        pass
+
+    def clear(self):
+        self.fill(1)
+
+
+font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+# 字符串重复到足够写满整个屏幕
+string = TEXT * (WIDTH * HEIGHT // (font.font_size * font.font_size) // len(TEXT) + 1)
+
+
+def fill_screen(display, **kwargs):
+    display.fill(1)
+    t = time.ticks_us()
+    font.text(display, string, 0, 0, auto_wrap=True, show=False, **kwargs)
+    return time.ticks_diff(time.ticks_us(), t)
+
+
+for name, kwargs in (
+    ("反色(黑字白底)", {"reverse": True}),
+    ("不透明", {"alpha_color": -1}),
+    ("背景透明", {}),
+):
+    blit_canvas = Canvas(False)
+    direct_canvas = Canvas(True)
+    blit_us = fill_screen(blit_canvas, **kwargs)
+    direct_us = fill_screen(direct_canvas, **kwargs)
+    print(
+        "{}: blit {:.1f}ms, 直接写入 {:.1f}ms, 结果{}".format(
+            name,
+            blit_us / 1000,
+            direct_us / 1000,
+            "一致" if blit_canvas.buffer == direct_canvas.buffer else "不一致",
+        )
+    )
+
+font.close_file()
@@ -0,0 +1,84 @@
+"""
+排版与绘制分离的耗时测试
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+测试内容:
+    在 128x64 的帧缓存(与 SSD1306 相同)上反复绘制自动换行的文字
+    分别测试每帧调用 text()、每帧 layout() + render()、保存排版结果后每帧只调用 render() 的耗时，
+    并比较三者的结果是否一致
+    不需要连接屏幕
+"""
+
+import time
+
+import framebuf
+
+import ufont
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+WIDTH = 128
+HEIGHT = 64
+FRAMES = 20
+TEXT = "室内 23.5℃\t湿度 45%\n空气质量: 优 PM2.5 12"
+
+ufont.DEBUG = False
+
+
+class Canvas(framebuf.FrameBuffer):
+    """只有帧缓存的显示对象"""
+
+    def __init__(self):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.buffer = bytearray(WIDTH * HEIGHT // 8)
+        super().__init__(self.buffer, WIDTH, HEIGHT, framebuf.MONO_VLSB)
+
+    def show(self):
+        pass
+
+
+font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+
+
+def timed(draw):
+    display = Canvas()
+    t = time.ticks_us()
+    for _ in range(FRAMES):
+        display.fill(0)
+        draw(display)
+    return time.ticks_diff(time.ticks_us(), t) / FRAMES, display.buffer
+
+
+text_us, text_buffer = timed(
+    lambda display: font.text(display, TEXT, 0, 0, auto_wrap=True, show=False)
+)
+both_us, both_buffer = timed(
+    lambda display: font.render(
+        display, font.layout(TEXT, 0, 0, wrap_width=WIDTH), show=False
+    )
+)
+layout = font.layout(TEXT, 0, 0, wrap_width=WIDTH)
+render_us, render_buffer = timed(lambda display: font.render(display, layout, show=False))
+
+t = time.ticks_us()
+for _ in range(FRAMES):
+    font.layout(TEXT, 0, 0, wrap_width=WIDTH)
+layout_us = time.ticks_diff(time.ticks_us(), t) / FRAMES
+
+print(
+    "每帧: text {:.0f}us, layout + render {:.0f}us, 只 render {:.0f}us, 结果{}".format(
+        text_us,
+        both_us,
+        render_us,
+        "一致" if text_buffer == both_buffer == render_buffer else "不一致",
+    )
+)
+print(
+    "排版: {} 个字符 {:.0f}us, 排版结果 {} Byte, 范围 {}".format(
+        len(layout), layout_us, len(layout.glyphs) * 4, layout.bbox
+    )
+)
+
+font.close_file()
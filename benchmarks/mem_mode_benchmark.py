@@ -0,0 +1,46 @@
+"""
+load_into_mem 两种存储方式的对比测试
+    字典模式: 每个字符一个 bytes 对象
+    紧凑模式: 全部点阵存放在一块连续内存中(packed_mem=True)
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    16x16ForDemos.bmf
+测试内容:
+    载入字体后的内存占用、单个字符获取点阵的平均耗时
+"""
+
+import gc
+import time
+
+import ufont
+
+FONT_FILE = "16x16ForDemos.bmf"
+TEST_STRING = "他日若遂凌云志，敢笑黄巢不丈夫! MicroPython 你好"
+ROUNDS = 20
+
+ufont.DEBUG = False
+
+
+def measure(**kwargs):
+    gc.collect()
+    free_before = gc.mem_free()
+    font = ufont.BMFont(FONT_FILE, load_into_mem=True, **kwargs)
+    gc.collect()
+    used = free_before - gc.mem_free()
+
+    buff = bytearray(font.bitmap_size)
+    codes = [ord(c) for c in TEST_STRING]
+    t = time.ticks_us()
+    for _ in range(ROUNDS):
+        for code in codes:
+            font.fast_get_bitmap(code, buff)
+    delta = time.ticks_diff(time.ticks_us(), t)
+    font.close_file()
+    return used, delta / (ROUNDS * len(codes))
+
+
+dict_used, dict_us = measure()
+packed_used, packed_us = measure(packed_mem=True)
+print("字典模式: 内存 {} Byte, 每字 {:.1f}us".format(dict_used, dict_us))
+print("紧凑模式: 内存 {} Byte, 每字 {:.1f}us".format(packed_used, packed_us))
@@ -0,0 +1,54 @@
+"""
+点阵放缩耗时测试
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    16x16ForDemos.bmf
+测试内容:
+    整数倍(16->32/48/64)与非整数倍(16->12/20/24/40)放缩时
+    预计算放缩方案的耗时、单个字符放缩的平均耗时与放缩过程中申请的内存
+"""
+
+import gc
+import time
+
+import ufont
+
+FONT_FILE = "16x16ForDemos.bmf"
+TEST_STRING = "他日若遂凌云志，敢笑黄巢不丈夫"
+SIZES = (32, 48, 64, 12, 20, 24, 40)
+ROUNDS = 10
+
+ufont.DEBUG = False
+
+font = ufont.BMFont(FONT_FILE, load_into_mem=True, packed_mem=True)
+buff = bytearray(font.bitmap_size)
+bitmaps = [bytes(font.fast_get_bitmap(ord(c), buff)) for c in TEST_STRING]
+
+for new_size in SIZES:
+    t = time.ticks_us()
+    plan = ufont.ResizePlan(font.font_size, new_size)
+    plan_us = time.ticks_diff(time.ticks_us(), t)
+
+    out = bytearray(plan.out_size)
+    gc.collect()
+    free_before = gc.mem_free()
+    t = time.ticks_us()
+    for _ in range(ROUNDS):
+        for bitmap in bitmaps:
+            plan.resize(bitmap, out)
+    delta = time.ticks_diff(time.ticks_us(), t)
+    allocated = free_before - gc.mem_free()
+
+    print(
+        "{}->{}: 方案 {}us, 查找表 {} Byte, 每字 {:.1f}us, 申请内存 {} Byte".format(
+            font.font_size,
+            new_size,
+            plan_us,
+            len(plan.lut),
+            delta / (ROUNDS * len(bitmaps)),
+            allocated,
+        )
+    )
+
+font.close_file()
@@ -0,0 +1,94 @@
+"""
+RGB565 展开点阵缓存的耗时测试
+Micropython版本: 1.19.1
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+测试内容:
+    在 240x240 的 RGB565 帧缓存(与 ST7789 相同)上模拟仪表盘刷新: 3 组颜色的固定文字反复重绘
+    分别测试不启用缓存、启用展开点阵缓存时每帧 text() 的耗时，比较两者的结果是否一致，并输出缓存占用与命中率
+    不需要连接屏幕
+"""
+
+import time
+
+import framebuf
+
+import ufont
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+WIDTH = 240
+HEIGHT = 240
+FRAMES = 10
+CACHE_SIZE = 48 * 1024
+# (文字, x, y, 字体颜色, 背景颜色, 透明色)
+ITEMS = (
+    ("室内温度 23.5℃ 湿度 45%", 0, 0, 0xFFFF, 0x0000, -1),
+    ("室外温度 18.2℃ 湿度 67%", 0, 32, 0xFFFF, 0x0000, -1),
+    ("空气质量 优 PM2.5 12", 0, 64, 0x07E0, 0x0000, -1),
+    ("警告: 窗户未关闭", 0, 96, 0xF800, 0xFFE0, -1),
+    ("更新于 12:30:45", 0, 128, 0x07E0, 0x0000, 0),
+    ("电量 87% 信号 强", 0, 160, 0xFFFF, 0x0000, 0),
+)
+
+ufont.DEBUG = False
+
+
+class Canvas(framebuf.FrameBuffer):
+    """只有帧缓存的显示对象"""
+
+    def __init__(self):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.buffer = bytearray(WIDTH * HEIGHT * 2)
+        super().__init__(self.buffer, WIDTH, HEIGHT, framebuf.RGB565)
+
+    def show(self):
+        pass
+
+
+def draw_frames(font, display):
+    t = time.ticks_us()
+    for _ in range(FRAMES):
+        display.fill(0)
+        for string, x, y, color, bg_color, alpha_color in ITEMS:
+            font.text(
+                display,
+                string,
+                x,
+                y,
+                color=color,
+                bg_color=bg_color,
+                alpha_color=alpha_color,
+                show=False,
+            )
+    return time.ticks_diff(time.ticks_us(), t) / FRAMES
+
+
+plain_display = Canvas()
+plain_font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+plain_us = draw_frames(plain_font, plain_display)
+plain_font.close_file()
+
+cached_display = Canvas()
+cached_font = ufont.BMFont(FONT_FILE, enable_mem_index=True, rgb565_cache_size=CACHE_SIZE)
+cached_us = draw_frames(cached_font, cached_display)
+stats = cached_font.rgb565_cache.stats()
+cached_font.close_file()
+
+print(
+    "每帧: 调色板 blit {:.1f}ms, 展开点阵缓存 {:.1f}ms, 结果{}".format(
+        plain_us / 1000,
+        cached_us / 1000,
+        "一致" if plain_display.buffer == cached_display.buffer else "不一致",
+    )
+)
+print(
+    "缓存: {} 个字符, 占用 {}/{} Byte, 命中率 {:.1%}, 淘汰 {} 次".format(
+        stats["entries"],
+        stats["used_bytes"],
+        stats["max_bytes"],
+        stats["hit_rate"],
+        stats["evictions"],
+    )
+)
@@ -0,0 +1,52 @@
+"""
+SSD1306 差异刷新的耗时测试
+Micropython版本: 1.19.1
+演示硬件:
+    SSD1306(OLED 128*64 IIC)
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+    drivers/ssd1306.py
+链接引脚:
+    SCL = 2
+    SDA = 3
+测试内容:
+    每帧只更新一个读数，分别测试整屏发送与 shadow=True(只发送变化的列)时 show() 的耗时和每帧节省的字节数
+"""
+
+import time
+
+from machine import I2C, Pin
+
+import ufont
+import drivers.ssd1306 as ssd1306
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+FRAMES = 20
+
+ufont.DEBUG = False
+font = ufont.BMFont(FONT_FILE, enable_mem_index=True)
+
+# 请修改为对应 FootPrint
+i2c = I2C(scl=Pin(2), sda=Pin(3), freq=400000)
+
+for shadow in (False, True):
+    display = ssd1306.SSD1306_I2C(128, 64, i2c, shadow=shadow)
+    font.text(display, "温度", 0, 0, show=False)
+    font.text(display, "湿度", 0, 16, show=False)
+    display.show()
+    show_us = 0
+    saved = 0
+    for frame in range(FRAMES):
+        font.text(display, "{:2d}".format(frame), 48, 16, alpha_color=-1, show=False)
+        t = time.ticks_us()
+        display.show()
+        show_us += time.ticks_diff(time.ticks_us(), t)
+        saved += display.bytes_saved
+    print(
+        "shadow={}: 每帧 show() {:.1f}ms, 发送 {} Byte, 节省 {} Byte".format(
+            shadow, show_us / FRAMES / 1000, display.bytes_sent, saved // FRAMES
+        )
+    )
+
+font.close_file()
@@ -0,0 +1,107 @@
+"""
+Viper 内核的正确性与耗时测试
+Micropython版本: 1.19.1 (也可以在 unix 端口上运行: micropython viper_kernel_benchmark.py)
+所需文件:
+    ufont.py
+    16x16ForDemos.bmf
+测试内容:
+    1. 放缩: ResizePlan.resize 与 Viper 实现的结果逐位比较、单个字符的平均耗时
+    2. RGB565 展开: 使用调色板的 FrameBuffer.blit 与 Viper 实现的结果逐位比较(包括超出屏幕与透明色)、单个字符的平均耗时
+"""
+
+import time
+from array import array
+
+import framebuf
+
+import ufont
+
+FONT_FILE = "16x16ForDemos.bmf"
+TEST_STRING = "他日若遂凌云志，敢笑黄巢不丈夫"
+SIZES = (32, 48, 12, 20, 24)
+ROUNDS = 10
+WIDTH = 240
+HEIGHT = 240
+
+ufont.DEBUG = False
+
+if ufont._viper_resize is None:
+    raise SystemExit("当前环境不支持 Viper")
+
+font = ufont.BMFont(FONT_FILE, load_into_mem=True, packed_mem=True)
+buff = bytearray(font.bitmap_size)
+bitmaps = [bytearray(font.fast_get_bitmap(ord(c), buff)) for c in TEST_STRING]
+
+
+def timed(func, items, *args):
+    t = time.ticks_us()
+    for _ in range(ROUNDS):
+        for item in items:
+            func(item, *args)
+    return time.ticks_diff(time.ticks_us(), t) / (ROUNDS * len(items))
+
+
+# 放缩
+for new_size in SIZES:
+    plan = ufont.ResizePlan(font.font_size, new_size)
+    out_py = bytearray(plan.out_size)
+    out_viper = bytearray(plan.out_size)
+    for bitmap in bitmaps:
+        plan.resize(bitmap, out_py)
+        ufont._viper_resize(plan, bitmap, out_viper)
+        assert out_py == out_viper, "放缩结果不一致: {}".format(new_size)
+    print(
+        "放缩 {}->{}: Python {:.1f}us, Viper {:.1f}us".format(
+            font.font_size,
+            new_size,
+            timed(plan.resize, bitmaps, out_py),
+            timed(lambda bitmap: ufont._viper_resize(plan, bitmap, out_viper), bitmaps),
+        )
+    )
+
+# RGB565 展开
+size = font.font_size
+color = 0xF800
+palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+buffer_blit = bytearray(WIDTH * HEIGHT * 2)
+buffer_viper = bytearray(WIDTH * HEIGHT * 2)
+display = framebuf.FrameBuffer(buffer_blit, WIDTH, HEIGHT, framebuf.RGB565)
+for bg_color, key in ((0x001F, -1), (0, 0), (0x001F, color)):
+    palette.pixel(0, 0, bg_color)
+    palette.pixel(1, 0, color)
+    params = array(
+        "I",
+        (
+            WIDTH,
+            HEIGHT,
+            0,
+            0,
+            size,
+            size,
+            ufont.ceildiv(size, 8),
+            color,
+            bg_color,
+            (color != key) | (bg_color != key) << 1,
+        ),
+    )
+    for x, y in ((0, 0), (-5, 3), (WIDTH - 7, HEIGHT - 9), (100, -12)):
+        params[2] = x + ufont._VIPER_COORD_BIAS
+        params[3] = y + ufont._VIPER_COORD_BIAS
+        for bitmap in bitmaps:
+            glyph = framebuf.FrameBuffer(bitmap, size, size, framebuf.MONO_HLSB)
+            display.blit(glyph, x, y, key, palette)
+            ufont._viper_blit_rgb565(bitmap, buffer_viper, params)
+            assert buffer_blit == buffer_viper, "展开结果不一致: {} {}".format(x, y)
+
+params[2] = params[3] = ufont._VIPER_COORD_BIAS
+glyphs = [framebuf.FrameBuffer(bitmap, size, size, framebuf.MONO_HLSB) for bitmap in bitmaps]
+print(
+    "RGB565 展开 {}x{}: blit {:.1f}us, Viper {:.1f}us".format(
+        size,
+        size,
+        timed(lambda glyph: display.blit(glyph, 0, 0, -1, palette), glyphs),
+        timed(ufont._viper_blit_rgb565, bitmaps, buffer_viper, params),
+    )
+)
+
+font.close_file()
@@ -39,7 +39,7 @@ class EPD(framebuf.FrameBuffer):
     LUT_PARTIAL_UPDATE = bytearray(
         b'\x10\x18\x18\x08\x18\x18\x08\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x13\x14\x44\x12\x00\x00\x00\x00\x00\x00')
 
-    def __init__(self, spi, cs, dc, rst, busy):
+    def __init__(self, spi, cs, dc, rst, busy, partial=False, full_refresh_every=10):
         self.spi = spi
         self.cs = Pin(cs, Pin.OUT, value=1)
         self.dc = Pin(dc, Pin.OUT, value=0)
@@ -49,25 +49,129 @@ class EPD(framebuf.FrameBuffer):
         self.height = EPD_HEIGHT
         self.pages = self.height // 8
         self.buffer = bytearray(self.width * self.pages)
+        # pixel format of self.buffer, lets ufont pick a faster drawing path
+        self.format = framebuf.MONO_HLSB
+        # with partial=True, show() only refreshes the region that differs from
+        # the frame on the panel, and does a full refresh every
+        # full_refresh_every partial refreshes to clear ghosting
+        self.shadow = bytearray(len(self.buffer)) if partial else None
+        self.shadow_valid = False
+        self.full_refresh_every = full_refresh_every
+        self.partial_count = 0
+        # (x, y, w, h) sent by the last show(), None if nothing changed
+        self.last_region = None
+        self.lut = None
+        # command and RAM address buffers, refilled instead of allocated per command
+        self._cmd = bytearray(1)
+        self._ram_x = bytearray(2)
+        self._ram_y = bytearray(4)
+        self._ram_x_counter = bytearray(1)
+        self._ram_y_counter = bytearray(2)
         super().__init__(self.buffer, self.width, self.height,
                          framebuf.MONO_HLSB)
         self.init()
 
     def clear(self):
-        self.buffer = (b'\xff' * self.width * self.pages)
+        # fill in place: self.buffer must stay the bytearray the FrameBuffer draws into
+        self.fill(1)
 
     def show(self):
-        self.set_frame_memory(self.buffer, 0, 0, 200, 200)
+        if self.shadow is None:
+            self.set_frame_memory(self.buffer, 0, 0, 200, 200)
+            self.display_frame()
+            self.last_region = (0, 0, self.width, self.height)
+            return
+        if not self.shadow_valid or self.partial_count >= self.full_refresh_every:
+            self.full_refresh()
+            return
+        region = self.changed_region()
+        self.last_region = region
+        if region is None:
+            return
+        self.set_refresh(False)
+        self.write_region(*region)
         self.display_frame()
+        # display_frame() switches to the other RAM, write the region again so
+        # both stay equal to the frame on the panel
+        self.write_region(*region)
+        x, y, w, h = region
+        stride = self.width // 8
+        start = y * stride + (x >> 3)
+        n = w >> 3
+        data = memoryview(self.buffer)
+        for _ in range(h):
+            self.shadow[start:start + n] = data[start:start + n]
+            start += stride
+        self.partial_count += 1
+
+    def full_refresh(self):
+        # refresh the whole panel with the full LUT, writing both RAMs
+        self.set_refresh(True)
+        self.set_frame_memory(self.buffer, 0, 0, self.width, self.height)
+        self.display_frame()
+        self.set_frame_memory(self.buffer, 0, 0, self.width, self.height)
+        self.last_region = (0, 0, self.width, self.height)
+        if self.shadow is not None:
+            self.shadow[:] = self.buffer
+            self.shadow_valid = True
+            self.partial_count = 0
+
+    def changed_region(self):
+        # XOR the buffer against the frame on the panel and return the
+        # byte-aligned bounding box (x, y, w, h) of the changes, or None
+        stride = self.width // 8
+        buffer = self.buffer
+        shadow = self.shadow
+        top = bottom = -1
+        left = stride
+        right = -1
+        for row in range(self.height):
+            start = row * stride
+            end = start + stride
+            if buffer[start:end] == shadow[start:end]:
+                continue
+            if top < 0:
+                top = row
+            bottom = row
+            # only the columns outside the current box need to be checked
+            for i in range(left):
+                if buffer[start + i] ^ shadow[start + i]:
+                    left = i
+                    break
+            for i in range(stride - 1, right, -1):
+                if buffer[start + i] ^ shadow[start + i]:
+                    right = i
+                    break
+        if top < 0:
+            return None
+        return left * 8, top, (right - left + 1) * 8, bottom - top + 1
+
+    def write_region(self, x, y, w, h):
+        # write a byte-aligned region of the buffer to the frame memory, row by row
+        stride = self.width // 8
+        self.set_memory_area(x, y, x + w - 1, y + h - 1)
+        self.set_memory_pointer(x, y)
+        self._command(WRITE_RAM)
+        data = memoryview(self.buffer)
+        start = y * stride + (x >> 3)
+        n = w >> 3
+        self.dc.value(1)
+        self.cs.value(0)
+        for _ in range(h):
+            self.spi.write(data[start:start + n])
+            start += stride
+        self.cs.value(1)
 
     def _command(self, command, data=None):
+        # command and data are sent in one chip select
+        self._cmd[0] = command
         self.dc.value(0)
         self.cs.value(0)
-        self.spi.write(command.to_bytes(1, 'big'))
-        # self.spi.write(bytearray([command]))
-        self.cs.value(1)
+        self.spi.write(self._cmd)
         if data is not None:
-            self._data(data)
+            self.dc.value(1)
+            self.spi.write(data)
+        self.cs.value(1)
 
     def _data(self, data):
         self.dc.value(1)
@@ -77,10 +181,11 @@ class EPD(framebuf.FrameBuffer):
 
     def init(self):
         self.reset()
-        self._command(DRIVER_OUTPUT_CONTROL)
-        self._data(bytearray([(EPD_HEIGHT - 1) & 0xFF]))
-        self._data(bytearray([((EPD_HEIGHT - 1) >> 8) & 0xFF]))
-        self._data(bytearray([0x00]))  # GD = 0 SM = 0 TB = 0
+        self._command(DRIVER_OUTPUT_CONTROL, bytes((
+            (EPD_HEIGHT - 1) & 0xFF,
+            ((EPD_HEIGHT - 1) >> 8) & 0xFF,
+            0x00,  # GD = 0 SM = 0 TB = 0
+        )))
         self._command(BOOSTER_SOFT_START_CONTROL, b'\xD7\xD6\x9D')
         self._command(WRITE_VCOM_REGISTER, b'\xA8')  # VCOM 7C
         self._command(SET_DUMMY_LINE_PERIOD, b'\x1A')  # 4 dummy lines per gate
@@ -88,6 +193,8 @@ class EPD(framebuf.FrameBuffer):
         self._command(DATA_ENTRY_MODE_SETTING, b'\x03')  # X increment Y increment
         # self._command(DATA_ENTRY_MODE_SETTING, b'\x07') # X increment Y increment
         self.set_lut(self.LUT_FULL_UPDATE)
+        # the panel content is unknown after a reset, the next show() refreshes everything
+        self.shadow_valid = False
 
     def wait_until_idle(self):
         while self.busy.value() == 1:
@@ -101,6 +208,7 @@ class EPD(framebuf.FrameBuffer):
 
     def set_lut(self, lut):
         self._command(WRITE_LUT_REGISTER, lut)
+        self.lut = lut
 
     # put an image in the frame memory
     def set_frame_memory(self, image, x, y, w, h):
@@ -127,10 +235,13 @@ class EPD(framebuf.FrameBuffer):
         self.set_memory_area(0, 0, self.width - 1, self.height - 1)
         self.set_memory_pointer(0, 0)
         self._command(WRITE_RAM)
-        # send the color data
-        for i in range(0, self.width // 8 * self.height):
-            # self._data(bytearray([color]))
-            self._data(bytearray(color))
+        # send the color data one row at a time
+        row = bytearray([color]) * (self.width // 8)
+        self.dc.value(1)
+        self.cs.value(0)
+        for _ in range(self.height):
+            self.spi.write(row)
+        self.cs.value(1)
 
     # draw the current frame memory and switch to the next memory area
     def display_frame(self):
@@ -141,18 +252,20 @@ class EPD(framebuf.FrameBuffer):
 
     # specify the memory area for data R/W
     def set_memory_area(self, x_start, y_start, x_end, y_end):
-        self._command(SET_RAM_X_ADDRESS_START_END_POSITION)
         # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self._data(bytearray([(x_start >> 3) & 0xFF]))
-        self._data(bytearray([(x_end >> 3) & 0xFF]))
-        self._command(SET_RAM_Y_ADDRESS_START_END_POSITION, ustruct.pack("<HH", y_start, y_end))
+        self._ram_x[0] = (x_start >> 3) & 0xFF
+        self._ram_x[1] = (x_end >> 3) & 0xFF
+        self._command(SET_RAM_X_ADDRESS_START_END_POSITION, self._ram_x)
+        ustruct.pack_into("<HH", self._ram_y, 0, y_start, y_end)
+        self._command(SET_RAM_Y_ADDRESS_START_END_POSITION, self._ram_y)
 
     # specify the start point for data R/W
     def set_memory_pointer(self, x, y):
-        self._command(SET_RAM_X_ADDRESS_COUNTER)
         # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self._data(bytearray([(x >> 3) & 0xFF]))
-        self._command(SET_RAM_Y_ADDRESS_COUNTER, ustruct.pack("<H", y))
+        self._ram_x_counter[0] = (x >> 3) & 0xFF
+        self._command(SET_RAM_X_ADDRESS_COUNTER, self._ram_x_counter)
+        ustruct.pack_into("<H", self._ram_y_counter, 0, y)
+        self._command(SET_RAM_Y_ADDRESS_COUNTER, self._ram_y_counter)
         self.wait_until_idle()
 
     # to wake call reset() or init()
@@ -161,4 +274,7 @@ class EPD(framebuf.FrameBuffer):
         self.wait_until_idle()
 
     def set_refresh(self, full_update=True):
-        self.set_lut(self.LUT_FULL_UPDATE) if full_update else self.set_lut(self.LUT_PARTIAL_UPDATE)
+        lut = self.LUT_FULL_UPDATE if full_update else self.LUT_PARTIAL_UPDATE
+        # skip resending the LUT that is already loaded
+        if lut is not self.lut:
+            self.set_lut(lut)
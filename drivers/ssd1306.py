@@ -23,21 +23,38 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+# with shadow=True, runs of unchanged bytes shorter than this stay inside one
+# span, since starting a new span costs 6 command bytes
+SPAN_GAP = const(8)
+
 
 # Subclassing FrameBuffer provides support for graphics primitives
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
 class SSD1306(framebuf.FrameBuffer):
-    def __init__(self, width, height, external_vcc):
+    def __init__(self, width, height, external_vcc, shadow=False):
         self.width = width
         self.height = height
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        # pixel format of self.buffer, lets ufont pick a faster drawing path
+        self.format = framebuf.MONO_VLSB
+        # copy of the last transmitted buffer, show() then only sends changed spans
+        self.shadow = bytearray(len(self.buffer)) if shadow else None
+        self.shadow_valid = False
+        # data bytes sent and skipped by the last show()
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        # column/page window commands, refilled by show() instead of allocated
+        self._window = bytearray(6)
+        self._window[0] = SET_COL_ADDR
+        self._window[3] = SET_PAGE_ADDR
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        # sent as one command stream instead of one transaction per byte
+        self.write_cmds(bytes((
                 SET_DISP,  # display off
                 # address setting
                 SET_MEM_ADDR,
@@ -70,9 +87,9 @@ class SSD1306(framebuf.FrameBuffer):
                 SET_CHARGE_PUMP,
                 0x10 if self.external_vcc else 0x14,
                 SET_DISP | 0x01,  # display on
-        ):  # on
-            self.write_cmd(cmd)
+        )))
         self.fill(0)
+        self.shadow_valid = False
         self.show()
 
     def poweroff(self):
@@ -91,8 +108,13 @@ class SSD1306(framebuf.FrameBuffer):
     def rotate(self, rotate):
         self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+        # the segment remap only applies to data written afterwards
+        self.shadow_valid = False
 
     def show(self):
+        if self.shadow is not None and self.shadow_valid:
+            self.show_changed()
+            return
         x0 = 0
         x1 = self.width - 1
         if self.width != 128:
@@ -100,43 +122,90 @@ class SSD1306(framebuf.FrameBuffer):
             col_offset = (128 - self.width) // 2
             x0 += col_offset
             x1 += col_offset
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
+        self.set_window(x0, x1, 0, self.pages - 1)
         self.write_data(self.buffer)
+        self.bytes_sent = len(self.buffer)
+        self.bytes_saved = 0
+        if self.shadow is not None:
+            self.shadow[:] = self.buffer
+            self.shadow_valid = True
+
+    def show_changed(self):
+        # compare each page with the shadow copy and send only the column
+        # spans that changed, each with its own column/page window
+        width = self.width
+        col_offset = (128 - width) // 2 if width != 128 else 0
+        buffer = self.buffer
+        shadow = self.shadow
+        data = memoryview(buffer)
+        sent = 0
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            if buffer[start:end] == shadow[start:end]:
+                continue
+            i = start
+            while i < end:
+                if buffer[i] == shadow[i]:
+                    i += 1
+                    continue
+                first = last = i
+                i += 1
+                while i < end and i - last <= SPAN_GAP:
+                    if buffer[i] != shadow[i]:
+                        last = i
+                    i += 1
+                self.set_window(first - start + col_offset, last - start + col_offset, page, page)
+                self.write_data(data[first : last + 1])
+                shadow[first : last + 1] = data[first : last + 1]
+                sent += last + 1 - first
+        self.bytes_sent = sent
+        self.bytes_saved = len(buffer) - sent
+
+    def set_window(self, x0, x1, page0, page1):
+        # set the column and page range for the following data in one transaction
+        window = self._window
+        window[1] = x0
+        window[2] = x1
+        window[4] = page0
+        window[5] = page1
+        self.write_cmds(window)
 
     def clear(self):
         self.fill(0)
 
 
 class SSD1306_I2C(SSD1306):
-    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False, shadow=False):
         self.i2c = i2c
         self.addr = addr
         self.temp = bytearray(2)
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
-        super().__init__(width, height, external_vcc)
+        self.cmd_list = [b"\x00", None]  # Co=0, D/C#=0
+        super().__init__(width, height, external_vcc, shadow)
 
     def write_cmd(self, cmd):
         self.temp[0] = 0x80  # Co=1, D/C#=0
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, buf):
+        self.cmd_list[1] = buf
+        self.i2c.writevto(self.addr, self.cmd_list)
+
     def write_data(self, buf):
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)
 
 
 class SSD1306_SPI(SSD1306):
-    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
+    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False, shadow=False):
         self.rate = 10 * 1024 * 1024
         dc.init(dc.OUT, value=0)
         res.init(res.OUT, value=0)
         cs.init(cs.OUT, value=1)
         self.spi = spi
+        self.cmd = bytearray(1)
         self.dc = dc
         self.res = res
         self.cs = cs
@@ -147,18 +216,27 @@ class SSD1306_SPI(SSD1306):
         self.res(0)
         time.sleep_ms(10)
         self.res(1)
-        super().__init__(width, height, external_vcc)
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        super().__init__(width, height, external_vcc, shadow)
 
-    def write_cmd(self, cmd):
+    def show(self):
+        # the bus may be shared with other devices, reconfigure it once per
+        # frame rather than before every write
         self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        super().show()
+
+    def write_cmd(self, cmd):
+        self.cmd[0] = cmd
+        self.write_cmds(self.cmd)
+
+    def write_cmds(self, buf):
         self.cs(1)
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(buf)
         self.cs(1)
 
     def write_data(self, buf):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs(1)
         self.dc(1)
         self.cs(0)
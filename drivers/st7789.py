@@ -73,6 +73,29 @@ VMCTR1 = const(0xC5)
 GMCTRP1 = const(0xE0)
 GMCTRN1 = const(0xE1)
 
+# 记录的刷新区域数量上限，超过后合并为一个
+DIRTY_LIMIT = const(8)
+
+# 初始化命令表 (命令, 参数)，同一张表在一次片选中发送
+FRAME_RATE_TABLE = (
+    (FRMCTR1, b"\x01\x2C\x2D"),
+    (FRMCTR2, b"\x01\x2C\x2D"),
+    (FRMCTR3, b"\x01\x2C\x2D\x01\x2C\x2D"),
+)
+POWER_TABLE = (
+    (INVCTR, b"\x07"),
+    (PWCTR1, b"\xA2\x02\x84"),
+    (PWCTR2, b"\xC5"),
+    (PWCTR3, b"\x0A\x00"),
+    (PWCTR4, b"\x8A\x2A"),
+    (PWCTR5, b"\x8A\xEE"),
+    (VMCTR1, b"\x0E"),
+)
+GAMMA_TABLE = (
+    (GMCTRP1, b"\x02\x1c\x07\x12\x37\x32\x29\x2d\x29\x25\x2b\x39\x00\x01\x03\x10"),
+    (GMCTRN1, b"\x03\x1d\x07\x06\x2e\x2c\x29\x2d\x2e\x2e\x37\x3f\x00\x00\x02\x10"),
+)
+
 # 旋转方向
 ROTATIONS = [0x00, 0x60, 0xC0, 0xA0]
 
@@ -130,6 +153,12 @@ class ST77XX(framebuf.FrameBuffer):
             self.bl = machine.PWM(machine.Pin(bl), duty=1023)
         self.auto_offset() if self.offset == (0, 0, 0, 0) else 0
 
+        # 等待 show_dirty() 刷新的区域 (x0, y0, x1, y1)，不包含 x1, y1
+        self.dirty = []
+        # 预先申请的命令与窗口缓冲区，发送命令时不再创建对象
+        self._cmd = bytearray(1)
+        self._window = bytearray(4)
+
         gc.collect()
         self.buffer = bytearray(self.height * self.width * 2)
         super().__init__(self.buffer, self.width, self.height, framebuf.RGB565)
@@ -154,18 +183,28 @@ class ST77XX(framebuf.FrameBuffer):
         设置窗口
         :return:
         """
-        x_start = x_start if x_start else self.offset[0]
-        y_start = y_start if y_start else self.offset[1]
-        x_end = x_end if x_end else self.offset[2]
-        y_end = y_end if y_end else self.offset[3]
-
-        self.write_cmd(CASET)
-        self.write_data(bytearray([x_start >> 8, x_start & 0xff, x_end >> 8, x_end & 0xff]))
-
-        self.write_cmd(RASET)
-        self.write_data(bytearray([y_start >> 8, y_start & 0xff, y_end >> 8, y_end & 0xff]))
+        x_start = self.offset[0] if x_start is None else x_start
+        y_start = self.offset[1] if y_start is None else y_start
+        x_end = self.offset[2] if x_end is None else x_end
+        y_end = self.offset[3] if y_end is None else y_end
 
-        self.write_cmd(RAMWR)
+        # CASET、RASET、RAMWR 在一次片选中发送
+        window = self._window
+        self.cs(0)
+        self._write_cmd(CASET)
+        window[0] = x_start >> 8
+        window[1] = x_start & 0xff
+        window[2] = x_end >> 8
+        window[3] = x_end & 0xff
+        self._write_param(window)
+        self._write_cmd(RASET)
+        window[0] = y_start >> 8
+        window[1] = y_start & 0xff
+        window[2] = y_end >> 8
+        window[3] = y_end & 0xff
+        self._write_param(window)
+        self._write_cmd(RAMWR)
+        self.cs(1)
 
     def init(self):
         self.reset()
@@ -175,45 +214,17 @@ class ST77XX(framebuf.FrameBuffer):
         self.write_cmd(SLPOUT)
         time.sleep_us(300)
 
-        self.write_cmd(FRMCTR1)
-        self.write_data(bytearray([0x01, 0x2C, 0x2D]))
-        self.write_cmd(FRMCTR2)
-        self.write_data(bytearray([0x01, 0x2C, 0x2D]))
-        self.write_cmd(FRMCTR3)
-        self.write_data(bytearray([0x01, 0x2C, 0x2D, 0x01, 0x2C, 0x2D]))
+        self.write_table(FRAME_RATE_TABLE)
         time.sleep_us(10)
-
-        self.write_cmd(INVCTR)
-        self.write_data(bytearray([0x07]))
-
-        self.write_cmd(PWCTR1)
-        self.write_data(bytearray([0xA2, 0x02, 0x84]))
-        self.write_cmd(PWCTR2)
-        self.write_data(bytearray([0xC5]))
-        self.write_cmd(PWCTR3)
-        self.write_data(bytearray([0x0A, 0x00]))
-        self.write_cmd(PWCTR4)
-        self.write_data(bytearray([0x8A, 0x2A]))
-        self.write_cmd(PWCTR5)
-        self.write_data(bytearray([0x8A, 0xEE]))
-        self.write_cmd(VMCTR1)
-        self.write_data(bytearray([0x0E]))
+        self.write_table(POWER_TABLE)
 
         self.write_cmd(INVOFF + int(self.inverse))
 
-        self.write_cmd(MADCTL)
-        self.write_data(bytearray([ROTATIONS[self.rotate] | 0x00 if self.rgb else 0x08]))
-
-        self.write_cmd(COLMOD)
-        self.write_data(bytearray([0x05]))
-
-        self.write_cmd(GMCTRP1)
-        self.write_data(
-            bytearray([0x02, 0x1c, 0x07, 0x12, 0x37, 0x32, 0x29, 0x2d, 0x29, 0x25, 0x2b, 0x39, 0x00, 0x01, 0x03, 0x10]))
-
-        self.write_cmd(GMCTRN1)
-        self.write_data(
-            bytearray([0x03, 0x1d, 0x07, 0x06, 0x2e, 0x2c, 0x29, 0x2d, 0x2e, 0x2e, 0x37, 0x3f, 0x00, 0x00, 0x02, 0x10]))
+        self.write_table((
+            (MADCTL, bytes([ROTATIONS[self.rotate] | 0x00 if self.rgb else 0x08])),
+            (COLMOD, b"\x05"),
+        ))
+        self.write_table(GAMMA_TABLE)
 
         self.write_cmd(NORON)
         time.sleep_us(10)
@@ -236,11 +247,33 @@ class ST77XX(framebuf.FrameBuffer):
         time.sleep(0.2)
 
     def write_cmd(self, cmd):
-        self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        self._write_cmd(cmd)
+        self.cs(1)
+
+    def write_table(self, table):
+        """
+        在一次片选中发送多条命令及其参数
+        :param table: ((命令, 参数), ...)，参数为 bytes
+        :return:
+        """
+        self.cs(0)
+        for cmd, param in table:
+            self._write_cmd(cmd)
+            self._write_param(param)
         self.cs(1)
 
+    def _write_cmd(self, cmd):
+        # 需要调用者控制片选
+        self._cmd[0] = cmd
+        self.dc(0)
+        self.spi.write(self._cmd)
+
+    def _write_param(self, buf):
+        # 需要调用者控制片选
+        self.dc(1)
+        self.spi.write(buf)
+
     def write_data(self, buf):
         self.dc(1)
         self.cs(0)
@@ -274,6 +307,70 @@ class ST77XX(framebuf.FrameBuffer):
         """
         self.set_windows()  # 如果没有这行就会偏移
         self.write_data(self.buffer)
+        self.dirty.clear()
+
+    def mark_dirty(self, x, y, w, h):
+        """
+        记录需要刷新的区域，由 show_dirty() 只发送这些区域，例如 display.mark_dirty(*font.text(...))
+        相交或相邻的区域会合并，超过 DIRTY_LIMIT 个时合并为一个
+        :param x: 左上角 x
+        :param y: 左上角 y
+        :param w: 宽度
+        :param h: 高度
+        :return:
+        """
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        dirty = self.dirty
+        i = 0
+        while i < len(dirty):
+            ax0, ay0, ax1, ay1 = dirty[i]
+            if x0 <= ax1 and ax0 <= x1 and y0 <= ay1 and ay0 <= y1:
+                # 合并后范围变大，需要重新与其他区域比较
+                x0, y0, x1, y1 = min(x0, ax0), min(y0, ay0), max(x1, ax1), max(y1, ay1)
+                dirty.pop(i)
+                i = 0
+            else:
+                i += 1
+        dirty.append((x0, y0, x1, y1))
+        if len(dirty) > DIRTY_LIMIT:
+            x0 = min(r[0] for r in dirty)
+            y0 = min(r[1] for r in dirty)
+            x1 = max(r[2] for r in dirty)
+            y1 = max(r[3] for r in dirty)
+            dirty.clear()
+            dirty.append((x0, y0, x1, y1))
+
+    def show_dirty(self):
+        """
+        只发送 mark_dirty() 记录的区域，每个区域通过 CASET/RASET 设置窗口后逐行发送帧缓存中对应的部分
+        :return: 发送的像素数据字节数
+        """
+        buffer = memoryview(self.buffer)
+        stride = self.width * 2
+        sent = 0
+        for x0, y0, x1, y1 in self.dirty:
+            self.set_windows(self.offset[0] + x0, self.offset[1] + y0,
+                             self.offset[0] + x1 - 1, self.offset[1] + y1 - 1)
+            self.dc(1)
+            self.cs(0)
+            if x0 == 0 and x1 == self.width:
+                # 整行宽度的区域在帧缓存中是连续的
+                self.spi.write(buffer[y0 * stride:y1 * stride])
+            else:
+                start = y0 * stride + x0 * 2
+                n = (x1 - x0) * 2
+                for _ in range(y1 - y0):
+                    self.spi.write(buffer[start:start + n])
+                    start += stride
+            self.cs(1)
+            sent += (x1 - x0) * (y1 - y0) * 2
+        self.dirty.clear()
+        return sent
 
     def circle(self, center, radius, c=color(255, 255, 255), section=100):
         """
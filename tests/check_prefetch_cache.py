@@ -0,0 +1,82 @@
+"""
+批量预取与字符点阵 LRU 缓存的检查
+Micropython版本: 1.19.1 (unix 端口)
+所需文件:
+    ufont.py
+    unifont-14-12917-16.v3.bmf
+    16x16ForDemos.bmf
+测试内容:
+    开启 glyph_cache_size 后用 prefetch=True 重复绘制同一字符串，
+    第二次起所有字符都应命中缓存且绘制结果与第一次相同，FontChain 检查共用的缓存
+    可以追加其他字体文件一起检查，如用 tools/bmf_tool.py convert --compress 生成的压缩字体
+    不需要连接屏幕，在仓库根目录运行: micropython tests/check_prefetch_cache.py [字体文件 ...]
+    检查失败时以非 0 状态退出
+"""
+
+import sys
+
+import framebuf
+
+sys.path.append(".")
+
+import ufont  # noqa: E402
+
+FONT_FILE = "unifont-14-12917-16.v3.bmf"
+DEMO_FONT_FILE = "16x16ForDemos.bmf"
+WIDTH = 128
+HEIGHT = 64
+TEXT = "温度 23.5℃ 湿度 45%"
+
+ufont.DEBUG = False
+
+
+class Canvas(framebuf.FrameBuffer):
+    """只有帧缓存的显示对象"""
+
+    def __init__(self):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.buffer = bytearray(WIDTH * HEIGHT // 8)
+        super().__init__(self.buffer, WIDTH, HEIGHT, framebuf.MONO_VLSB)
+
+    def show(self):
+        pass
+
+
+def draw(font):
+    display = Canvas()
+    font.text(display, TEXT, 0, 0, show=False, prefetch=True)
+    return bytes(display.buffer)
+
+
+def check(name, font):
+    """绘制两次，返回错误信息列表"""
+    errors = []
+    glyph_cache = font.glyph_cache
+    first = draw(font)
+    misses = glyph_cache.stats()["misses"]
+    hits = glyph_cache.stats()["hits"]
+    second = draw(font)
+    stats = glyph_cache.stats()
+    if stats["hits"] <= hits:
+        errors.append("{}: 第二次绘制没有命中缓存 {}".format(name, stats))
+    if stats["misses"] != misses:
+        errors.append("{}: 第二次绘制仍有未命中 {}".format(name, stats))
+    if first != second:
+        errors.append("{}: 两次绘制结果不同".format(name))
+    print("{}: hits {}, misses {}".format(name, stats["hits"], stats["misses"]))
+    return errors
+
+
+errors = []
+for font_file in [FONT_FILE] + sys.argv[1:]:
+    errors += check(font_file, ufont.BMFont(font_file, glyph_cache_size=4096))
+chain = ufont.FontChain(
+    [ufont.BMFont(DEMO_FONT_FILE), ufont.BMFont(FONT_FILE)], glyph_cache_size=4096
+)
+errors += check("FontChain", chain)
+
+for error in errors:
+    print(error)
+print("失败" if errors else "通过")
+sys.exit(1 if errors else 0)
@@ -0,0 +1,323 @@
+"""
+Viper 内核与 Python 实现的逐位比较
+Micropython版本: 1.19.1 (unix 端口，固件需要支持 Viper)
+所需文件:
+    ufont.py
+    16x16ForDemos.bmf
+测试内容:
+    1. 用字体中的字符与随机数据直接调用各内核，与对应的 Python 实现逐位比较:
+        _viper_resize 与 ResizePlan.resize
+        _viper_blit_rgb565 与使用 RGB565 调色板的 FrameBuffer.blit(包括超出屏幕、透明色与最高位为 1 的颜色)
+        _viper_key_rgb565 与带透明色的 RGB565 FrameBuffer.blit
+        _viper_or_pages 与逐字节按位或
+        _viper_hlsb_rows 与逐字节的复制、按位或、取反(每行最后一个字节按掩码合并)
+    2. 在 MONO_HLSB、MONO_VLSB、RGB565 帧缓存上用 text() 绘制(放缩、反色、透明色、超出屏幕)，
+       比较启用 Viper 内核与全部退回原有实现时的帧缓存
+    3. 在高度不是 8 的倍数的 MONO_VLSB 屏幕上，比较按页点阵缓存与 blit 绘制的可见像素
+    不需要连接屏幕，在仓库根目录运行: micropython tests/check_viper_kernels.py
+    有不一致或当前固件不支持 Viper 时以非 0 状态退出
+"""
+
+import sys
+from array import array
+
+import framebuf
+
+sys.path.append(".")
+
+import ufont  # noqa: E402
+
+FONT_FILE = "16x16ForDemos.bmf"
+TEST_STRING = "他日若遂凌云志，敢笑黄巢不丈夫"
+KERNELS = (
+    "_viper_resize",
+    "_viper_blit_rgb565",
+    "_viper_or_pages",
+    "_viper_hlsb_rows",
+    "_viper_key_rgb565",
+)
+
+ufont.DEBUG = False
+
+if ufont._viper_resize is None:
+    print("当前固件不支持 Viper")
+    sys.exit(2)
+
+_seed = 1
+
+
+def rand(n: int) -> int:
+    """与平台无关的伪随机数，保证每次运行的测试数据相同"""
+    global _seed
+    _seed = (_seed * 1103515245 + 12345) & 0x7FFFFFFF
+    return (_seed >> 8) % n
+
+
+def rand_bytes(n: int) -> bytearray:
+    return bytearray(rand(256) for _ in range(n))
+
+
+class Canvas(framebuf.FrameBuffer):
+    """只有帧缓存的显示对象"""
+
+    def __init__(self, width, height, format, buffer=None):
+        self.width = width
+        self.height = height
+        self.format = format
+        if buffer is None:
+            if format == framebuf.RGB565:
+                size = width * height * 2
+            elif format == framebuf.MONO_VLSB:
+                size = width * ufont.ceildiv(height, 8)
+            else:
+                size = ufont.ceildiv(width, 8) * height
+            buffer = rand_bytes(size)
+        self.buffer = buffer
+        super().__init__(buffer, width, height, format)
+
+    def show(self):
+        pass
+
+
+failures = 0
+cases = 0
+
+
+def expect(equal, message):
+    global failures, cases
+    cases += 1
+    if not equal:
+        failures += 1
+        print("不一致:", message)
+
+
+font = ufont.BMFont(FONT_FILE, load_into_mem=True, packed_mem=True)
+buff = bytearray(font.bitmap_size)
+glyphs = [bytes(font.fast_get_bitmap(ord(c), buff)) for c in TEST_STRING]
+
+# 1. 放缩，除了字体中的字符也使用其他字号的随机点阵
+for old_size in (16, 12, 24, 7):
+    bitmap_size = ufont.ceildiv(old_size, 8) * old_size
+    bitmaps = [rand_bytes(bitmap_size) for _ in range(6)]
+    if old_size == font.font_size:
+        bitmaps += glyphs
+    for new_size in (8, 12, 16, 20, 24, 32, 33, 48, 5):
+        if new_size == old_size:
+            continue
+        plan = ufont.ResizePlan(old_size, new_size)
+        for bitmap in bitmaps:
+            fill = rand(256)
+            out_py = bytearray([fill]) * plan.out_size
+            out_viper = bytearray([fill]) * plan.out_size
+            plan.resize(bitmap, out_py)
+            ufont._viper_resize(plan, bitmap, out_viper)
+            expect(out_py == out_viper, "放缩 {}->{}".format(old_size, new_size))
+
+# 2. RGB565 展开
+WIDTH = 48
+HEIGHT = 40
+size = font.font_size
+palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+for color, bg_color in ((0xF800, 0x001F), (0xFFFF, 0), (0x8001, 0x7FFE), (0x07E0, 0xFFE0)):
+    palette.pixel(0, 0, bg_color)
+    palette.pixel(1, 0, color)
+    for key in (-1, color, bg_color):
+        params = array(
+            "I",
+            (
+                WIDTH,
+                HEIGHT,
+                0,
+                0,
+                size,
+                size,
+                ufont.ceildiv(size, 8),
+                color,
+                bg_color,
+                (color != key) | (bg_color != key) << 1,
+            ),
+        )
+        for x, y in ((0, 0), (-5, 3), (WIDTH - 7, HEIGHT - 9), (20, -12), (-16, 0)):
+            params[2] = x + ufont._VIPER_COORD_BIAS
+            params[3] = y + ufont._VIPER_COORD_BIAS
+            for bitmap in glyphs[:4]:
+                buffer_blit = rand_bytes(WIDTH * HEIGHT * 2)
+                buffer_viper = bytearray(buffer_blit)
+                display = framebuf.FrameBuffer(buffer_blit, WIDTH, HEIGHT, framebuf.RGB565)
+                glyph = framebuf.FrameBuffer(bytearray(bitmap), size, size, framebuf.MONO_HLSB)
+                display.blit(glyph, x, y, key, palette)
+                ufont._viper_blit_rgb565(bitmap, buffer_viper, params)
+                expect(
+                    buffer_blit == buffer_viper,
+                    "RGB565 展开 {:04X}/{:04X} key {} ({}, {})".format(color, bg_color, key, x, y),
+                )
+
+# 3. 带透明色的 RGB565 复制，与 _blit_rgb565 使用相同的裁剪参数
+for key in (0x0000, 0xFFFF, 0x8001):
+    for x, y, w in ((0, 0, 16), (-5, 3, 16), (WIDTH - 7, HEIGHT - 9, 12), (20, -12, 9)):
+        pixels = bytearray()
+        for _ in range(size * size):
+            value = key if rand(3) == 0 else rand(0x10000)
+            pixels += bytes((value & 0xFF, value >> 8))
+        col_start = -x if x < 0 else 0
+        col_end = w if x + w <= WIDTH else WIDTH - x
+        row_start = -y if y < 0 else 0
+        row_end = size if y + size <= HEIGHT else HEIGHT - y
+        buffer_blit = rand_bytes(WIDTH * HEIGHT * 2)
+        buffer_viper = bytearray(buffer_blit)
+        display = framebuf.FrameBuffer(buffer_blit, WIDTH, HEIGHT, framebuf.RGB565)
+        display.blit(framebuf.FrameBuffer(pixels, w, size, framebuf.RGB565, size), x, y, key)
+        params = array(
+            "I",
+            (
+                col_end - col_start,
+                row_end - row_start,
+                row_start * size + col_start,
+                size,
+                (y + row_start) * WIDTH + x + col_start,
+                WIDTH,
+                key,
+            ),
+        )
+        ufont._viper_key_rgb565(pixels, buffer_viper, params)
+        expect(buffer_blit == buffer_viper, "RGB565 透明色复制 key {:04X} ({}, {})".format(key, x, y))
+
+# 4. 按页按位或
+for n, pages, si, src_stride, di, dst_stride in (
+    (16, 2, 0, 16, 0, 48),
+    (11, 2, 5, 16, 37, 48),
+    (1, 1, 15, 16, 47, 48),
+    (24, 3, 0, 24, 24, 128),
+):
+    src = rand_bytes(src_stride * pages)
+    dst_py = rand_bytes(dst_stride * pages + di)
+    dst_viper = bytearray(dst_py)
+    s, d = si, di
+    for _ in range(pages):
+        for i in range(n):
+            dst_py[d + i] |= src[s + i]
+        s += src_stride
+        d += dst_stride
+    ufont._viper_or_pages(src, dst_viper, array("I", (n, pages, si, src_stride, di, dst_stride)))
+    expect(dst_py == dst_viper, "按页按位或 {}x{}".format(n, pages))
+
+# 5. MONO_HLSB 按行写入
+for op in (ufont._DIRECT_COPY, ufont._DIRECT_OR, ufont._DIRECT_INVERT):
+    for n, rows, si, src_stride, di, dst_stride, mask in (
+        (2, 16, 0, 2, 0, 6, 0xFF),
+        (2, 16, 0, 2, 3, 6, 0xF0),
+        (1, 7, 4, 2, 5, 6, 0x80),
+        (3, 24, 0, 3, 1, 25, 0xFE),
+    ):
+        src = rand_bytes(src_stride * rows + si)
+        dst_py = rand_bytes(dst_stride * rows + di)
+        dst_viper = bytearray(dst_py)
+        s, d = si, di
+        for _ in range(rows):
+            for i in range(n):
+                value = src[s + i]
+                if op == ufont._DIRECT_INVERT:
+                    value ^= 0xFF
+                if i == n - 1:
+                    value &= mask
+                    if op == ufont._DIRECT_OR:
+                        dst_py[d + i] |= value
+                    else:
+                        dst_py[d + i] = (dst_py[d + i] & (mask ^ 0xFF)) | value
+                elif op == ufont._DIRECT_OR:
+                    dst_py[d + i] |= value
+                else:
+                    dst_py[d + i] = value
+            s += src_stride
+            d += dst_stride
+        ufont._viper_hlsb_rows(
+            src, dst_viper, array("I", (n, rows, si, src_stride, di, dst_stride, mask, op))
+        )
+        expect(dst_py == dst_viper, "MONO_HLSB 按行写入 op {} mask {:02X}".format(op, mask))
+
+font.close_file()
+
+# 6. text() 启用与不启用 Viper 内核的结果比较
+kernels = {name: getattr(ufont, name) for name in KERNELS}
+
+
+def set_kernels(enabled):
+    for name in KERNELS:
+        setattr(ufont, name, kernels[name] if enabled else None)
+
+
+fonts = (
+    ufont.BMFont(FONT_FILE),
+    ufont.BMFont(FONT_FILE, vlsb_cache_size=4096, rgb565_cache_size=16384),
+)
+mono_variants = (
+    {},
+    {"reverse": True},
+    {"alpha_color": -1},
+    {"alpha_color": 1},
+)
+rgb565_variants = (
+    {"color": 0xF800, "bg_color": 0x001F, "alpha_color": -1},
+    {"color": 0xFFFF, "bg_color": 0},
+    {"color": 0x8001, "bg_color": 0x7FFE, "alpha_color": 0x7FFE},
+    {"color": 0x07E0, "bg_color": 0xFFE0},
+)
+for format, color_type, variants in (
+    (framebuf.MONO_HLSB, 0, mono_variants),
+    (framebuf.MONO_VLSB, 0, mono_variants),
+    (framebuf.RGB565, 1, rgb565_variants),
+):
+    for text_font in fonts:
+        for font_size in (None, 24, 12):
+            for kwargs in variants:
+                for x, y in ((0, 0), (8, 8), (13, 3), (-5, -6), (40, 30)):
+                    initial = Canvas(64, 40, format).buffer
+                    results = []
+                    for enabled in (True, False):
+                        set_kernels(enabled)
+                        display = Canvas(64, 40, format, bytearray(initial))
+                        text_font.text(
+                            display,
+                            TEST_STRING[:6] + "Ab1",
+                            x,
+                            y,
+                            font_size=font_size,
+                            show=False,
+                            color_type=color_type,
+                            **kwargs
+                        )
+                        results.append(bytes(display.buffer))
+                    set_kernels(True)
+                    expect(
+                        results[0] == results[1],
+                        "text() format {} font_size {} {} ({}, {})".format(
+                            format, font_size, kwargs, x, y
+                        ),
+                    )
+
+# 7. 按页点阵缓存与 blit 的可见像素比较，最后一页只有部分行可见
+for width, height in ((61, 37), (13, 9), (64, 40)):
+    for kwargs in mono_variants + ({"color": 0, "bg_color": 1},):
+        for font_size in (None, 24, 12):
+            for y in (0, 8, 16, 32):
+                initial = Canvas(width, height, framebuf.MONO_VLSB).buffer
+                results = []
+                # 第二次使用按页点阵缓存时命中缓存
+                for text_font in (fonts[0], fonts[1], fonts[1]):
+                    display = Canvas(width, height, framebuf.MONO_VLSB, bytearray(initial))
+                    text_font.text(
+                        display, TEST_STRING[:2] + "Ab1", 0, y, font_size=font_size, show=False, **kwargs
+                    )
+                    results.append(
+                        bytes(display.pixel(i, j) for j in range(height) for i in range(width))
+                    )
+                expect(
+                    results[0] == results[1] == results[2],
+                    "MONO_VLSB {}x{} font_size {} {} y {}".format(width, height, font_size, kwargs, y),
+                )
+
+for text_font in fonts:
+    text_font.close_file()
+
+print("{} 项比较，{} 项不一致".format(cases, failures))
+sys.exit(1 if failures else 0)
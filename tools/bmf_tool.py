@@ -0,0 +1,378 @@
+"""
+BMF 字体文件工具(在 PC 上使用 CPython 运行)
+
+用法:
+    python tools/bmf_tool.py convert unifont-14-12917-16.v3.bmf unifont-14-12917-16.v4.bmf --version 4
+    python tools/bmf_tool.py convert 16x16ForDemos.bmf 16x16ForDemos.v4z.bmf --compress
+    python tools/bmf_tool.py convert 16x16ForDemos.bmf 16x16ForDemos.v4m.bmf --metrics
+    python tools/bmf_tool.py freeze 16x16ForDemos.bmf font_demo.py
+    python tools/bmf_tool.py subset unifont-14-12917-16.v3.bmf ui.bmf text.txt --ascii
+
+支持读取与写出 v3、v4 两种格式的字体文件
+"""
+
+import argparse
+import struct
+
+HEADER_LEN = 0x10
+
+# v4 文件头标志位：点阵经过压缩
+FLAG_COMPRESSED = 0x01
+# v4 文件头标志位：包含每个字符的步进宽度与墨迹宽度
+FLAG_METRICS = 0x02
+# 压缩点阵每组的字符数，每组记录一次起始偏移
+GLYPH_GROUP = 32
+
+
+def ceildiv(a: int, b: int) -> int:
+    return -(a // -b)
+
+
+def compress_glyph(bitmap: bytes, font_size: int) -> bytes:
+    """
+    行去重压缩：行掩码 + 新出现的行，掩码中为 0 的行与上一行相同(第一行之前视为空行)
+    压缩后不比原始数据短、或超过 255 字节时返回空字节串，表示按原样存储
+    """
+    row_bytes = ceildiv(font_size, 8)
+    rows = len(bitmap) // row_bytes
+    mask = 0
+    literal = bytearray()
+    previous = bytes(row_bytes)
+    for row in range(rows):
+        data = bitmap[row * row_bytes : (row + 1) * row_bytes]
+        if data != previous:
+            mask |= 1 << row
+            literal += data
+        previous = data
+    record = mask.to_bytes(ceildiv(rows, 8), "little") + literal
+    if len(record) >= len(bitmap) or len(record) > 0xFF:
+        return b""
+    return record
+
+
+def decompress_glyph(record: bytes, font_size: int, bitmap_size: int) -> bytes:
+    """compress_glyph 的逆过程"""
+    row_bytes = ceildiv(font_size, 8)
+    rows = bitmap_size // row_bytes
+    mask_len = ceildiv(rows, 8)
+    mask = int.from_bytes(record[:mask_len], "little")
+    pos = mask_len
+    bitmap = bytearray()
+    previous = bytes(row_bytes)
+    for row in range(rows):
+        if mask >> row & 1:
+            previous = record[pos : pos + row_bytes]
+            pos += row_bytes
+        bitmap += previous
+    return bytes(bitmap)
+
+
+class BMFData:
+    """字体文件的内容：按码点升序排列的字符与对应点阵"""
+
+    def __init__(self, font_size: int, bitmap_size: int, map_mode: int = 0):
+        self.font_size = font_size
+        self.bitmap_size = bitmap_size
+        self.map_mode = map_mode
+        self.codes: list[int] = []
+        self.bitmaps: list[bytes] = []
+        # 每个字符的 (步进宽度, 墨迹宽度)，为 None 表示不包含度量表
+        self.metrics: list[tuple[int, int]] | None = None
+
+    def add(self, code: int, bitmap: bytes, metrics: tuple[int, int] | None = None):
+        """添加字符，调用者需保证码点升序"""
+        if len(bitmap) != self.bitmap_size:
+            raise ValueError(f"点阵长度不正确: U+{code:04X}")
+        self.codes.append(code)
+        self.bitmaps.append(bytes(bitmap))
+        if metrics is not None:
+            if self.metrics is None:
+                self.metrics = []
+            self.metrics.append(metrics)
+
+    def subset(self, codes: set[int]) -> "BMFData":
+        """只保留 codes 中的字符"""
+        font = BMFData(self.font_size, self.bitmap_size, self.map_mode)
+        metrics = self.metrics or [None] * len(self.codes)
+        for code, bitmap, metric in zip(self.codes, self.bitmaps, metrics):
+            if code in codes:
+                font.add(code, bitmap, metric)
+        return font
+
+    def ink_columns(self, bitmap: bytes) -> tuple[int, int]:
+        """返回 (最左侧有像素的列, 最右侧有像素的列 + 1)，空白字符为 (0, 0)"""
+        row_bytes = ceildiv(self.font_size, 8)
+        columns = 0
+        for offset in range(0, len(bitmap), row_bytes):
+            columns |= int.from_bytes(bitmap[offset : offset + row_bytes], "big")
+        columns >>= row_bytes * 8 - self.font_size
+        if columns == 0:
+            return 0, 0
+        # MONO_HLSB 中高位在左
+        left = self.font_size - columns.bit_length()
+        right = self.font_size - ((columns & -columns).bit_length() - 1)
+        return left, right
+
+    def compute_metrics(self, spacing: int = 1):
+        """
+        根据点阵计算字符度量
+        墨迹宽度为最右侧有像素的列 + 1
+        步进宽度为墨迹宽度加上 spacing 减去字符自身左侧的空白列数(不小于 0)，且不超过字号，
+        所以墨迹占满字号的字符没有间距，实际间距还取决于下一个字符左侧的空白
+        没有墨迹的字符步进宽度为半角(码点 < 0x2E80)或全角，墨迹宽度为 0
+        """
+        self.metrics = []
+        for code, bitmap in zip(self.codes, self.bitmaps):
+            left, ink = self.ink_columns(bitmap)
+            if ink == 0:
+                advance = self.font_size // 2 if code < 0x2E80 else self.font_size
+            else:
+                advance = min(ink + max(spacing - left, 0), self.font_size)
+            self.metrics.append((advance, ink))
+
+    def runs(self) -> list[tuple[int, int, int]]:
+        """将连续码点合并为区间 [(起始码点, 长度, 首字符索引), ...]"""
+        result = []
+        for index, code in enumerate(self.codes):
+            if result and result[-1][0] + result[-1][1] == code:
+                begin, length, first = result[-1]
+                result[-1] = (begin, length + 1, first)
+            else:
+                result.append((code, 1, index))
+        return result
+
+
+def read_bmf(path: str) -> BMFData:
+    """读取 v3 或 v4 字体文件"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[0:2] != b"BM":
+        raise ValueError("字体文件格式不正确: " + path)
+    version = data[2]
+    map_mode = data[3]
+    if version == 3:
+        start_bitmap = int.from_bytes(data[4:7], "big")
+        font_size = data[7]
+        bitmap_size = data[8]
+        word_num = (start_bitmap - HEADER_LEN) // 2
+        codes = struct.unpack(f">{word_num}H", data[HEADER_LEN:start_bitmap])
+        flags = 0
+    elif version == 4:
+        start_bitmap, font_size, flags, bitmap_size, run_num, word_num = struct.unpack(
+            "<IBBHHH", data[4:HEADER_LEN]
+        )
+        fields = struct.unpack(f"<{run_num * 3}H", data[HEADER_LEN : HEADER_LEN + run_num * 6])
+        codes = []
+        for i in range(run_num):
+            codes.extend(range(fields[i], fields[i] + fields[run_num + i]))
+    else:
+        raise ValueError("字体文件版本不正确: " + str(version))
+
+    # 区间索引之后依次是可选的压缩定位表与度量表
+    metrics = [None] * len(codes)
+    if version == 4:
+        table_start = align4(HEADER_LEN + run_num * 6)
+        if flags & FLAG_COMPRESSED:
+            length_table = table_start + ceildiv(word_num, GLYPH_GROUP) * 4
+            lengths = data[length_table : length_table + word_num]
+            table_start = align4(length_table + word_num)
+        if flags & FLAG_METRICS:
+            table = data[table_start : table_start + word_num * 2]
+            metrics = [(table[i], table[i + 1]) for i in range(0, len(table), 2)]
+
+    font = BMFData(font_size, bitmap_size, map_mode)
+    if flags & FLAG_COMPRESSED:
+        offset = start_bitmap
+        for code, length, metric in zip(codes, lengths, metrics):
+            if length == 0:
+                font.add(code, data[offset : offset + bitmap_size], metric)
+                offset += bitmap_size
+            else:
+                record = data[offset : offset + length]
+                font.add(code, decompress_glyph(record, font_size, bitmap_size), metric)
+                offset += length
+        return font
+
+    for index, (code, metric) in enumerate(zip(codes, metrics)):
+        offset = start_bitmap + index * bitmap_size
+        font.add(code, data[offset : offset + bitmap_size], metric)
+    return font
+
+
+def align4(n: int) -> int:
+    return n + (-n % 4)
+
+
+def pack_v3(font: BMFData) -> bytes:
+    """生成 v3 格式：大端序、每个字符 2 字节的码点索引"""
+    if font.bitmap_size > 0xFF:
+        raise ValueError("v3 格式的单字点阵字节大小不能超过 255")
+    start_bitmap = HEADER_LEN + len(font.codes) * 2
+    header = b"BM" + bytes((3, font.map_mode))
+    header += start_bitmap.to_bytes(3, "big") + bytes((font.font_size, font.bitmap_size))
+    header += bytes(HEADER_LEN - len(header))
+    index = struct.pack(f">{len(font.codes)}H", *font.codes)
+    return header + index + b"".join(font.bitmaps)
+
+
+def pack_v4(font: BMFData, compress: bool = False) -> bytes:
+    """
+    生成 v4 格式：小端序的码点区间索引，位图按 4 字节对齐
+    compress 为 True 时逐字选择行去重压缩或原样存储，并在区间索引后写入定位表
+    字体包含度量时在定位表之后写入度量表
+    """
+    runs = font.runs()
+    run_num = len(runs)
+    index = struct.pack(
+        f"<{run_num * 3}H",
+        *(run[0] for run in runs),
+        *(run[1] for run in runs),
+        *(run[2] for run in runs),
+    )
+    index += bytes(align4(HEADER_LEN + len(index)) - HEADER_LEN - len(index))
+
+    flags = 0
+    if compress:
+        flags |= FLAG_COMPRESSED
+        group_offsets = []
+        lengths = bytearray()
+        records = []
+        offset = 0
+        for i, bitmap in enumerate(font.bitmaps):
+            if i % GLYPH_GROUP == 0:
+                group_offsets.append(offset)
+            record = compress_glyph(bitmap, font.font_size)
+            lengths.append(len(record))
+            records.append(record or bitmap)
+            offset += len(records[-1])
+        index += struct.pack(f"<{len(group_offsets)}I", *group_offsets) + lengths
+        index += bytes(align4(HEADER_LEN + len(index)) - HEADER_LEN - len(index))
+        bitmaps = b"".join(records)
+    else:
+        bitmaps = b"".join(font.bitmaps)
+
+    if font.metrics is not None:
+        flags |= FLAG_METRICS
+        index += bytes(value for metric in font.metrics for value in metric)
+        index += bytes(align4(HEADER_LEN + len(index)) - HEADER_LEN - len(index))
+
+    start_bitmap = HEADER_LEN + len(index)
+    header = b"BM" + bytes((4, font.map_mode))
+    header += struct.pack(
+        "<IBBHHH", start_bitmap, font.font_size, flags, font.bitmap_size, run_num, len(font.codes)
+    )
+    return header + index + bitmaps
+
+
+PACKERS = {3: pack_v3, 4: pack_v4}
+
+# 冻结模块中每行 bytes 字面量的字节数
+FREEZE_LINE_BYTES = 32
+
+
+def freeze_module(data: bytes, source: str) -> str:
+    """
+    生成包含字体数据的 Python 模块源码
+    相邻的 bytes 字面量在编译时合并为一个常量，冻结进固件后位于 flash 中
+    """
+    lines = [
+        f'"""由 tools/bmf_tool.py 从 {source} 生成，请勿手动修改"""',
+        "",
+        "FONT = (",
+    ]
+    for offset in range(0, len(data), FREEZE_LINE_BYTES):
+        chunk = data[offset : offset + FREEZE_LINE_BYTES]
+        lines.append('    b"' + "".join(f"\\x{byte:02x}" for byte in chunk) + '"')
+    lines.append(")")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def cmd_convert(args):
+    font = read_bmf(args.input)
+    if (args.compress or args.metrics) and args.version != 4:
+        raise SystemExit("只有 v4 格式支持压缩与字符度量")
+    if args.metrics:
+        font.compute_metrics(args.spacing)
+    data = pack_v4(font, compress=True) if args.compress else PACKERS[args.version](font)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"{args.output}: v{args.version}, {len(font.codes)} 个字符, {len(data)} 字节")
+    if args.version == 4:
+        print(f"码点区间数量: {len(font.runs())}")
+    if args.compress:
+        compressed = sum(1 for bitmap in font.bitmaps if compress_glyph(bitmap, font.font_size))
+        print(f"压缩的字符: {compressed}/{len(font.codes)}, 文件大小为未压缩的 {len(data) / len(pack_v4(font)):.1%}")
+
+
+def cmd_freeze(args):
+    with open(args.input, "rb") as f:
+        data = f.read()
+    read_bmf(args.input)  # 校验字体文件
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(freeze_module(data, args.input))
+    print(f"{args.output}: {len(data)} 字节")
+
+
+def cmd_subset(args):
+    wanted = set()
+    for path in args.corpus:
+        with open(path, encoding="utf-8") as f:
+            wanted.update(ord(char) for char in f.read())
+    if args.chars:
+        wanted.update(ord(char) for char in args.chars)
+    if args.ascii:
+        wanted.update(range(0x20, 0x7F))
+    # 控制字符由 text() 处理，不需要点阵
+    wanted = {code for code in wanted if code >= 0x20}
+
+    source = read_bmf(args.input)
+    font = source.subset(wanted)
+    missing = sorted(wanted - set(font.codes))
+    data = PACKERS[args.version](font)
+    with open(args.output, "wb") as f:
+        f.write(data)
+
+    print(f"{args.output}: v{args.version}, {len(font.codes)} 个字符, {len(data)} 字节")
+    print(
+        f"覆盖率: {len(font.codes)}/{len(wanted)} "
+        f"({len(font.codes) / max(len(wanted), 1):.1%})"
+    )
+    if missing:
+        print(f"缺失 {len(missing)} 个字符:")
+        print(" ".join(f"{chr(code)}(U+{code:04X})" for code in missing))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BMF 字体文件工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="转换字体文件格式")
+    convert.add_argument("input", help="源字体文件")
+    convert.add_argument("output", help="输出字体文件")
+    convert.add_argument("--version", type=int, choices=sorted(PACKERS), default=4)
+    convert.add_argument("--compress", action="store_true", help="逐字压缩点阵(仅 v4)")
+    convert.add_argument("--metrics", action="store_true", help="写入字符度量表(仅 v4)")
+    convert.add_argument("--spacing", type=int, default=1, help="字符度量中的字间距")
+    convert.set_defaults(func=cmd_convert)
+
+    freeze = sub.add_parser("freeze", help="生成可冻结进固件的字体模块")
+    freeze.add_argument("input", help="源字体文件")
+    freeze.add_argument("output", help="输出的 .py 模块")
+    freeze.set_defaults(func=cmd_freeze)
+
+    subset = sub.add_parser("subset", help="按文本语料裁剪字体")
+    subset.add_argument("input", help="源字体文件")
+    subset.add_argument("output", help="输出字体文件")
+    subset.add_argument("corpus", nargs="*", help="UTF-8 编码的文本语料")
+    subset.add_argument("--chars", default="", help="额外需要保留的字符")
+    subset.add_argument("--ascii", action="store_true", help="保留全部可打印 ASCII 字符")
+    subset.add_argument("--version", type=int, choices=sorted(PACKERS), default=3)
+    subset.set_defaults(func=cmd_subset)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
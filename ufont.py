@@ -37,6 +37,21 @@ import struct
 import gc
 import framebuf, micropython
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
+try:
+    import os
+except ImportError:
+    import uos as os
+
 
 # 这是一种更高效的整数向上取整除法
 # 避免浮点数误差和浮点运算开销
@@ -52,9 +67,63 @@ _SPACE_CODE = const(0x20)
 _MIN_PRINTABLE_CODE = const(0x20)
 _MAX_ASCII = const(0x7F)
 
+# 批量读取时，索引每次读取的码点个数
+_BATCH_INDEX_WORDS = const(256)
+# 批量读取时，相隔不超过该数量的点阵记录合并为一次读取
+_BATCH_MERGE_GAP = const(4)
+# 批量读取时，单次合并读取的最大字节数
+_BATCH_READ_LIMIT = const(2048)
+
 # 字体文件头长度
 _HEADER_LEN = const(0x10)
 
+# v4 字体码点区间数量不超过该值时，区间索引常驻内存
+_V4_RUNS_IN_MEM = const(512)
+
+# v4 文件头标志位：点阵经过压缩
+_FLAG_COMPRESSED = const(0x01)
+# v4 文件头标志位：包含每个字符的步进宽度与墨迹宽度
+_FLAG_METRICS = const(0x02)
+# 压缩点阵每组的字符数(2 的幂)，每组记录一次起始偏移
+_GLYPH_GROUP_SHIFT = const(5)
+
+# 同时保留的放缩方案数量
+_RESIZE_PLAN_LIMIT = const(4)
+
+# 传给 Viper 内核的坐标偏移，使坐标始终为正数
+_VIPER_COORD_BIAS = const(0x8000)
+
+# 点阵直接写入单色帧缓存的方式: 复制、按位或、取反后复制
+_DIRECT_COPY = const(1)
+_DIRECT_OR = const(2)
+_DIRECT_INVERT = const(3)
+
+# 排版结果按 int16 记录，坐标超出该范围的字符不会记录
+_INT16_MIN = const(-0x8000)
+_INT16_MAX = const(0x7FFF)
+# 字体的码点为 uint16，排版结果中 BMP 之外的字符记为非字符 U+FFFF，绘制时按缺失字符处理
+_NONCHARACTER = const(0xFFFF)
+
+# RGB565 展开点阵缓存中同时记录的 (字体颜色, 背景颜色) 组合数量，超过后清空重新记录
+_RGB565_PAIR_LIMIT = const(16)
+
+# 缺失字符缓存的容量，超过后清空重新记录
+_MISSING_CACHE_SIZE = const(64)
+
+# 各阶段计时，改为 1 后通过 font.stats() 查看
+# 为 0 时 if _PROFILE 分支在编译时就会被删除，不产生任何开销
+_PROFILE = const(0)
+_PHASE_INDEX = const(0)
+_PHASE_READ = const(1)
+_PHASE_RESIZE = const(2)
+_PHASE_BLIT = const(3)
+_PHASE_SHOW = const(4)
+_PHASE_NAMES = ("index", "read", "resize", "blit", "show")
+
+# 元数据文件标识与版本，文件尾再写一次标识，缺少时说明写入中断
+_META_MAGIC = b"UFMT"
+_META_VERSION = const(2)
+
 # 索引分块(起始与结束)
 # 拉丁字母
 _BLOCK_LATIN_B = const(0)
@@ -96,10 +165,655 @@ def timed_function(f, *args, **kwargs):
     return new_func
 
 
+class _BufferFile:
+    """
+    将 bytes、bytearray、memoryview 等缓冲区包装为只读文件，
+    使冻结在固件中的字体数据可以复用按文件读取的逻辑
+    """
+
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.pos = 0
+
+    def seek(self, offset: int, whence: int = 0):
+        self.pos = offset
+        return offset
+
+    def tell(self) -> int:
+        return self.pos
+
+    def read(self, size: int) -> bytes:
+        pos = self.pos
+        self.pos = pos + size
+        return bytes(self.data[pos : pos + size])
+
+    def readinto(self, buf) -> int:
+        pos = self.pos
+        size = min(len(buf), len(self.data) - pos)
+        buf[:size] = self.data[pos : pos + size]
+        self.pos = pos + size
+        return size
+
+    def close(self):
+        pass
+
+
+class GlyphCache:
+    """
+    点阵数据的 LRU 缓存，按字节预算淘汰最久未使用的字符
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: 缓存可占用的点阵字节数上限
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        # OrderedDict 保持插入顺序，最前面的就是最久未使用的
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, code: int):
+        """查询缓存，命中时将其移动到队尾，未命中返回 None"""
+        bitmap = self._data.pop(code, None)
+        if bitmap is None:
+            self.misses += 1
+            return None
+        self._data[code] = bitmap
+        self.hits += 1
+        return bitmap
+
+    def put(self, code: int, bitmap: bytes):
+        """写入缓存，超出预算时从队首开始淘汰"""
+        size = len(bitmap)
+        if size > self.max_bytes:
+            return
+        old = self._data.pop(code, None)
+        if old is not None:
+            self.used_bytes -= len(old)
+        data = self._data
+        while self.used_bytes + size > self.max_bytes:
+            oldest = next(iter(data))
+            self.used_bytes -= len(data.pop(oldest))
+            self.evictions += 1
+        data[code] = bitmap
+        self.used_bytes += size
+
+    def clear(self):
+        """清空缓存，计数器保持不变"""
+        self._data = OrderedDict()
+        self.used_bytes = 0
+
+    def stats(self) -> dict:
+        """返回命中、未命中、淘汰次数、命中率以及占用情况"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "entries": len(self._data),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class ResizePlan:
+    """
+    邻近插值放缩的预计算方案，每对 (原字号, 新字号) 只需计算一次
+
+    输出的每个字节只取决于原始行中的一到两个字节，预先为每个 (输出字节, 原始字节) 组合生成
+    256 项的查找表，放缩时逐字节查表再按位或即可，整数倍放大时就是字节扩展表。
+    映射相同的查找表会共用，2 倍放大只需要 2 张表。输出行与上一行来自同一原始行时直接复制整行。
+    """
+
+    def __init__(self, old_size: int, new_size: int):
+        self.old_size = old_size
+        self.new_size = new_size
+        self.row_bytes = ceildiv(old_size, 8)
+        self.new_row_bytes = ceildiv(new_size, 8)
+        self.out_size = self.new_row_bytes * new_size
+
+        # 新坐标到原坐标的映射，与之前的放缩算法保持一致
+        if (new_size % old_size) == 0 and new_size > old_size:
+            scale = new_size // old_size
+            src_of = [x // scale for x in range(new_size)]
+        else:
+            # 定点数放大1024倍，不会真的有人需要缩放1024多倍吧🤔，应该不用担心精度问题。
+            scale_fixed = int((old_size << 10) / new_size)
+            src_of = [(x * scale_fixed) >> 10 for x in range(new_size)]
+        # 每个输出行对应的原始行起始字节
+        self.row_offsets = array("H", (y * self.row_bytes for y in src_of))
+
+        # 每个输出字节依次由 byte_src[i] 处的原始字节经 lut[byte_lut[i]:] 查表后按位或得到
+        # 其中 i 属于 [byte_start[j], byte_start[j + 1])
+        luts = {}
+        lut = bytearray()
+        byte_src = bytearray()
+        byte_lut = []
+        byte_start = [0]
+        for j in range(self.new_row_bytes):
+            parts = {}
+            for bit in range(8):
+                x = (j << 3) + bit
+                if x >= new_size:
+                    break
+                old_x = src_of[x]
+                parts.setdefault(old_x >> 3, []).append((7 - (old_x & 7), 7 - bit))
+            for src in sorted(parts):
+                key = tuple(parts[src])
+                offset = luts.get(key)
+                if offset is None:
+                    offset = len(lut)
+                    table = bytearray(256)
+                    for value in range(256):
+                        out = 0
+                        for src_bit, out_bit in key:
+                            if (value >> src_bit) & 1:
+                                out |= 1 << out_bit
+                        table[value] = out
+                    lut.extend(table)
+                    luts[key] = offset
+                byte_src.append(src)
+                byte_lut.append(offset)
+            byte_start.append(len(byte_src))
+        self.lut = bytes(lut)
+        self.byte_src = bytes(byte_src)
+        self.byte_lut = array("I", byte_lut)
+        self.byte_start = array("H", byte_start)
+        # 当前输出行
+        self.row_buff = bytearray(self.new_row_bytes)
+
+    def resize(self, src, out: bytearray) -> bytearray:
+        """
+        将原字号点阵 src 放缩到 out，过程中不创建新的缓冲区
+
+        Returns:
+            out
+        """
+        new_row_bytes = self.new_row_bytes
+        row_offsets = self.row_offsets
+        lut = self.lut
+        byte_src = self.byte_src
+        byte_lut = self.byte_lut
+        byte_start = self.byte_start
+        row_buff = self.row_buff
+        prev = -1
+        o = 0
+        for y in range(self.new_size):
+            # 与上一行来自同一原始行时不需要重新查表
+            row = row_offsets[y]
+            if row != prev:
+                for j in range(new_row_bytes):
+                    value = 0
+                    for i in range(byte_start[j], byte_start[j + 1]):
+                        value |= lut[byte_lut[i] + src[row + byte_src[i]]]
+                    row_buff[j] = value
+                prev = row
+            out[o : o + new_row_bytes] = row_buff
+            o += new_row_bytes
+        return out
+
+
+# 最近使用的放缩方案，所有字体共用
+_RESIZE_PLANS = OrderedDict()
+# 上一次使用的方案，字号不变时不需要访问 _RESIZE_PLANS
+_last_resize_plan = None
+
+
+def _resize_plan(old_size: int, new_size: int) -> ResizePlan:
+    """
+    字号与上一次不同时取得 (原字号, 新字号) 的放缩方案，没有时生成，只保留最近 _RESIZE_PLAN_LIMIT 个
+    字号不变时调用者直接使用 _last_resize_plan
+    """
+    global _last_resize_plan
+    key = (old_size, new_size)
+    plan = _RESIZE_PLANS.pop(key, None)
+    if plan is None:
+        plan = ResizePlan(old_size, new_size)
+        if len(_RESIZE_PLANS) >= _RESIZE_PLAN_LIMIT:
+            _RESIZE_PLANS.pop(next(iter(_RESIZE_PLANS)))
+    _RESIZE_PLANS[key] = plan
+    _last_resize_plan = plan
+    return plan
+
+
+# Viper 内核
+# 以下函数与 ResizePlan.resize、FrameBuffer.blit(调色板为 RGB565)的结果逐位相同，
+# 不支持 Viper 的环境(如在电脑上运行)会自动退回原有实现
+
+
+@micropython.viper
+def _viper_probe(buf) -> int:
+    return int(ptr8(buf)[0])
+
+
+# ResizePlan.resize 的 Viper 实现
+@micropython.viper
+def _viper_resize(plan, src, out):
+    s = ptr8(src)
+    o = ptr8(out)
+    row_offsets = ptr16(plan.row_offsets)
+    lut = ptr8(plan.lut)
+    byte_src = ptr8(plan.byte_src)
+    byte_lut = ptr32(plan.byte_lut)
+    byte_start = ptr16(plan.byte_start)
+    new_size = int(plan.new_size)
+    new_row_bytes = int(plan.new_row_bytes)
+    prev = -1
+    pos = 0
+    y = 0
+    while y < new_size:
+        row = int(row_offsets[y])
+        if row == prev:
+            j = pos
+            while j < pos + new_row_bytes:
+                o[j] = o[j - new_row_bytes]
+                j += 1
+        else:
+            j = 0
+            while j < new_row_bytes:
+                value = 0
+                i = int(byte_start[j])
+                end = int(byte_start[j + 1])
+                while i < end:
+                    value |= int(lut[int(byte_lut[i]) + int(s[row + int(byte_src[i])])])
+                    i += 1
+                o[pos + j] = value
+                j += 1
+            prev = row
+        pos += new_row_bytes
+        y += 1
+    return out
+
+
+# 将 MONO_HLSB 点阵直接展开到 RGB565 帧缓存，等价于使用 RGB565 调色板与透明色的 blit
+# params 为 array("I"): 屏幕宽, 屏幕高, x, y, 点阵宽, 点阵高, 点阵每行字节数, 字体颜色, 背景颜色, 绘制标志
+#   x, y 加上 _VIPER_COORD_BIAS 后传入，ptr32 读出的是无符号数，在 64 位平台上无法直接表示负数
+#   绘制标志 bit0: 绘制字体颜色 bit1: 绘制背景颜色(与透明色相同的颜色不绘制)
+@micropython.viper
+def _viper_blit_rgb565(glyph, buffer, params):
+    g = ptr8(glyph)
+    d = ptr16(buffer)
+    p = ptr32(params)
+    width = int(p[0])
+    height = int(p[1])
+    x = int(p[2]) - _VIPER_COORD_BIAS
+    y = int(p[3]) - _VIPER_COORD_BIAS
+    w = int(p[4])
+    h = int(p[5])
+    stride = int(p[6])
+    color = int(p[7])
+    bg_color = int(p[8])
+    draw_color = int(p[9]) & 1
+    draw_bg = int(p[9]) & 2
+
+    # 裁剪到屏幕范围
+    col_start = 0
+    if x < 0:
+        col_start = -x
+    col_end = w
+    if x + w > width:
+        col_end = width - x
+    row = 0
+    if y < 0:
+        row = -y
+    row_end = h
+    if y + h > height:
+        row_end = height - y
+
+    while row < row_end:
+        line = (y + row) * width + x
+        src = row * stride
+        col = col_start
+        while col < col_end:
+            if (int(g[src + (col >> 3)]) >> (7 - (col & 7))) & 1:
+                if draw_color:
+                    d[line + col] = color
+            elif draw_bg:
+                d[line + col] = bg_color
+            col += 1
+        row += 1
+
+
+# 将按页排列的点阵与帧缓存按位或
+# params 为 array("I"): 列数, 页数, 点阵起始位置, 点阵每页字节数, 帧缓存起始位置, 帧缓存每页字节数
+@micropython.viper
+def _viper_or_pages(src, dst, params):
+    s = ptr8(src)
+    d = ptr8(dst)
+    p = ptr32(params)
+    n = int(p[0])
+    pages = int(p[1])
+    si = int(p[2])
+    src_stride = int(p[3])
+    di = int(p[4])
+    dst_stride = int(p[5])
+    page = 0
+    while page < pages:
+        i = 0
+        while i < n:
+            d[di + i] = d[di + i] | s[si + i]
+            i += 1
+        si += src_stride
+        di += dst_stride
+        page += 1
+
+
+# 将 MONO_HLSB 点阵按行写入 MONO_HLSB 帧缓存，x 按字节对齐
+# params 为 array("I"): 每行字节数, 行数, 点阵起始位置, 点阵每行字节数, 帧缓存起始位置, 帧缓存每行字节数,
+#   每行最后一个字节的掩码, 写入方式(_DIRECT_COPY / _DIRECT_OR / _DIRECT_INVERT)
+@micropython.viper
+def _viper_hlsb_rows(src, dst, params):
+    s = ptr8(src)
+    d = ptr8(dst)
+    p = ptr32(params)
+    n = int(p[0]) - 1
+    rows = int(p[1])
+    si = int(p[2])
+    src_stride = int(p[3])
+    di = int(p[4])
+    dst_stride = int(p[5])
+    mask = int(p[6])
+    op = int(p[7])
+    row = 0
+    while row < rows:
+        i = 0
+        while i <= n:
+            value = int(s[si + i])
+            if op == _DIRECT_INVERT:
+                value ^= 0xFF
+            if i == n:
+                value &= mask
+                if op == _DIRECT_OR:
+                    d[di + i] = int(d[di + i]) | value
+                else:
+                    d[di + i] = (int(d[di + i]) & (mask ^ 0xFF)) | value
+            elif op == _DIRECT_OR:
+                d[di + i] = int(d[di + i]) | value
+            else:
+                d[di + i] = value
+            i += 1
+        si += src_stride
+        di += dst_stride
+        row += 1
+
+
+# 将展开后的 RGB565 点阵按行复制到 RGB565 帧缓存，与透明色相同的像素不写入
+# params 为 array("I"): 每行像素数, 行数, 点阵起始像素, 点阵每行像素数, 帧缓存起始像素, 帧缓存每行像素数, 透明色
+@micropython.viper
+def _viper_key_rgb565(src, dst, params):
+    s = ptr16(src)
+    d = ptr16(dst)
+    p = ptr32(params)
+    n = int(p[0])
+    rows = int(p[1])
+    si = int(p[2])
+    src_stride = int(p[3])
+    di = int(p[4])
+    dst_stride = int(p[5])
+    key = int(p[6])
+    row = 0
+    while row < rows:
+        i = 0
+        while i < n:
+            value = int(s[si + i])
+            if value != key:
+                d[di + i] = value
+            i += 1
+        si += src_stride
+        di += dst_stride
+        row += 1
+
+
+try:
+    _viper_probe(bytearray(1))
+except NameError:
+    _viper_resize = None
+    _viper_blit_rgb565 = None
+    _viper_or_pages = None
+    _viper_hlsb_rows = None
+    _viper_key_rgb565 = None
+
+# 传给 Viper 内核的参数，重复使用避免每个字符申请内存
+_KERNEL_PARAMS = array("I", (0, 0, 0, 0, 0, 0, 0, 0))
+
+
+def _hlsb_to_vlsb(bitmap, size: int, invert: int) -> bytes:
+    """
+    将 MONO_HLSB 点阵转换为 MONO_VLSB 的页排列：每页 size 字节，每字节为一列中的 8 行，低位在上
+
+    Args:
+        bitmap: MONO_HLSB 点阵，每行 ceildiv(size, 8) 字节
+        size: 点阵宽高
+        invert: 为 1 时输出取反的点阵
+    """
+    row_bytes = ceildiv(size, 8)
+    out = bytearray(ceildiv(size, 8) * size)
+    for row in range(size):
+        bit = 1 << (row & 7)
+        base = (row >> 3) * size
+        src = row * row_bytes
+        for i in range(row_bytes):
+            value = bitmap[src + i]
+            if not value:
+                continue
+            col = base + (i << 3)
+            for k in range(8):
+                if value & (0x80 >> k):
+                    out[col + k] |= bit
+    if invert:
+        for i in range(len(out)):
+            out[i] ^= 0xFF
+    return bytes(out)
+
+
+def _blit_hlsb(display, bitmap, x: int, y: int, w: int, size: int, op: int):
+    """
+    将 MONO_HLSB 点阵按行写入 MONO_HLSB 帧缓存，x 必须按字节(8 像素)对齐且不小于 0
+
+    Args:
+        display: 显示对象，需要 width、height、buffer 属性
+        bitmap: 点阵，每行 ceildiv(size, 8) 字节
+        x, y: 左上角坐标
+        w: 绘制的列数
+        size: 点阵宽高
+        op: _DIRECT_COPY / _DIRECT_OR / _DIRECT_INVERT，没有 Viper 时只支持 _DIRECT_COPY
+    """
+    stride = ceildiv(display.width, 8)
+    col = x >> 3
+    # 绘制到 end 列为止，每行最后一个字节只写入 end 之前的列
+    end = min(x + w, display.width)
+    n = ceildiv(end, 8) - col
+    if n <= 0:
+        return
+    mask = (0xFF << (((col + n) << 3) - end)) & 0xFF
+    row_start = -y if y < 0 else 0
+    rows = min(size, display.height - y) - row_start
+    if rows <= 0:
+        return
+    row_bytes = ceildiv(size, 8)
+    buffer = display.buffer
+    src = row_start * row_bytes
+    dst = (y + row_start) * stride + col
+    if _viper_hlsb_rows is not None:
+        params = _KERNEL_PARAMS
+        params[0] = n
+        params[1] = rows
+        params[2] = src
+        params[3] = row_bytes
+        params[4] = dst
+        params[5] = stride
+        params[6] = mask
+        params[7] = op
+        _viper_hlsb_rows(bitmap, buffer, params)
+        return
+
+    # 整字节部分按行切片复制，最后一个字节按掩码合并
+    bitmap = memoryview(bitmap)
+    if mask == 0xFF:
+        for _ in range(rows):
+            buffer[dst : dst + n] = bitmap[src : src + n]
+            src += row_bytes
+            dst += stride
+        return
+    last = n - 1
+    for _ in range(rows):
+        if last:
+            buffer[dst : dst + last] = bitmap[src : src + last]
+        buffer[dst + last] = (buffer[dst + last] & ~mask) | (bitmap[src + last] & mask)
+        src += row_bytes
+        dst += stride
+
+
+def _blit_vlsb(display, vlsb, x: int, y: int, w: int, size: int, op: int):
+    """
+    将按页排列的点阵写入 MONO_VLSB 帧缓存，y 必须按页(8 像素)对齐
+
+    Args:
+        display: 显示对象，需要 width、height、buffer 属性
+        vlsb: _hlsb_to_vlsb 得到的点阵
+        x, y: 左上角坐标
+        w: 绘制的列数
+        size: 点阵宽高
+        op: _DIRECT_COPY 直接写入，_DIRECT_OR 按位或
+    """
+    width = display.width
+    col_start = -x if x < 0 else 0
+    col_end = w if x + w <= width else width - x
+    n = col_end - col_start
+    if n <= 0:
+        return
+    page = y >> 3
+    # 高度不是 8 的倍数时最后一页只有部分行可见，整字节写入不影响显示
+    pages = min(ceildiv(size, 8), ceildiv(display.height, 8) - page)
+    if pages <= 0:
+        return
+    buffer = display.buffer
+    src = col_start
+    dst = page * width + x + col_start
+    if op == _DIRECT_OR:
+        params = _KERNEL_PARAMS
+        params[0] = n
+        params[1] = pages
+        params[2] = src
+        params[3] = size
+        params[4] = dst
+        params[5] = width
+        _viper_or_pages(vlsb, buffer, params)
+        return
+
+    vlsb = memoryview(vlsb)
+    # 字号不是 8 的倍数时，最后一页只有部分行属于点阵
+    full_pages = size >> 3
+    for p in range(pages):
+        if p < full_pages:
+            buffer[dst : dst + n] = vlsb[src : src + n]
+        else:
+            mask = (1 << (size & 7)) - 1
+            for i in range(n):
+                buffer[dst + i] = (buffer[dst + i] & ~mask) | (vlsb[src + i] & mask)
+        src += size
+        dst += width
+
+
+def _expand_rgb565(bitmap, size: int, palette) -> bytearray:
+    """
+    将 MONO_HLSB 点阵按调色板展开为 RGB565 点阵，像素的字节顺序与 FrameBuffer 相同
+
+    Args:
+        bitmap: MONO_HLSB 点阵
+        size: 点阵宽高
+        palette: text() 构建的 RGB565 调色板
+    """
+    pixels = bytearray(size * size * 2)
+    framebuf.FrameBuffer(pixels, size, size, framebuf.RGB565).blit(
+        framebuf.FrameBuffer(bitmap, size, size, framebuf.MONO_HLSB), 0, 0, -1, palette
+    )
+    return pixels
+
+
+def _blit_rgb565(display, pixels, x: int, y: int, w: int, size: int, key: int, direct):
+    """
+    将展开后的 RGB565 点阵写入显示对象，不经过调色板
+
+    Args:
+        display: 显示对象
+        pixels: _expand_rgb565 得到的点阵
+        x, y: 左上角坐标
+        w: 绘制的列数
+        size: 点阵宽高
+        key: 透明色，为 -1 时没有透明像素
+        direct: 帧缓存为每像素 2 字节且行跨度等于屏幕宽度，可以直接写入 display.buffer
+    """
+    if not direct or (key != -1 and _viper_key_rgb565 is None):
+        display.blit(
+            framebuf.FrameBuffer(pixels, w, size, framebuf.RGB565, size), x, y, key
+        )
+        return
+    width = display.width
+    height = display.height
+    col_start = -x if x < 0 else 0
+    col_end = w if x + w <= width else width - x
+    n = col_end - col_start
+    row_start = -y if y < 0 else 0
+    row_end = size if y + size <= height else height - y
+    rows = row_end - row_start
+    if n <= 0 or rows <= 0:
+        return
+    buffer = display.buffer
+    src = row_start * size + col_start
+    dst = (y + row_start) * width + x + col_start
+    if key != -1:
+        params = _KERNEL_PARAMS
+        params[0] = n
+        params[1] = rows
+        params[2] = src
+        params[3] = size
+        params[4] = dst
+        params[5] = width
+        params[6] = key
+        _viper_key_rgb565(pixels, buffer, params)
+        return
+
+    # 没有透明像素时每行一次切片复制
+    pixels = memoryview(pixels)
+    n <<= 1
+    src <<= 1
+    dst <<= 1
+    src_stride = size << 1
+    dst_stride = width << 1
+    for _ in range(rows):
+        buffer[dst : dst + n] = pixels[src : src + n]
+        src += src_stride
+        dst += dst_stride
+
+
+class Layout:
+    """
+    layout() 的排版结果，与显示对象无关，可以保存下来由 render() 在多帧中反复绘制
+
+    glyphs 为 array("h")，每个字符 8 字节，依次为 码点, x, y, 绘制宽度(等宽排版时为字号，按度量排版时为墨迹宽度)
+    码点按 uint16 存放，读取时需要 & 0xFFFF，BMP 之外的字符记为 U+FFFF；坐标超出 int16 的字符不会记录
+    bbox 为 (x, y, 宽, 高)，包含所有可显示字符(含空白字符)的步进范围，没有可显示字符时宽高为 0
+    """
+
+    def __init__(self, string: str, font_size: int, glyphs, bbox: tuple):
+        self.string = string
+        self.font_size = font_size
+        self.glyphs = glyphs
+        self.bbox = bbox
+
+    def __len__(self) -> int:
+        return len(self.glyphs) >> 2
+
+
 class BMFont:
 
     # @timed_function
-    @micropython.native
     def text(
         self,
         display,
@@ -117,6 +831,8 @@ class BMFont:
         reverse: bool = False,
         color_type: int = -1,
         line_spacing: int = 0,
+        prefetch: bool = False,
+        proportional: bool = False,
     ):
         """
         Args:
@@ -135,21 +851,187 @@ class BMFont:
             reverse: 反色(MONO)
             color_type: 色彩模式 0:MONO 1:RGB565
             line_spacing: 行间距
+            prefetch: 预先批量读取整个字符串的点阵，适合长文本
+            proportional: 按字体中的字符度量排版，只绘制有墨迹的列(需要字体包含度量表)，忽略 half_char
 
         Returns:
+            绘制时改动过的屏幕范围 (x, y, 宽, 高)，见 render()
         MoreInfo: https://github.com/AntonVanke/MicroPython-uFont/blob/master/README.md
         """
-        width = display.width
-        height = display.height
+        layout = self.layout(
+            string,
+            x,
+            y,
+            font_size,
+            half_char,
+            display.width if auto_wrap else None,
+            line_spacing,
+            proportional,
+        )
+        return self.render(
+            display,
+            layout,
+            0,
+            0,
+            color,
+            bg_color,
+            show,
+            clear,
+            alpha_color,
+            reverse,
+            color_type,
+            prefetch,
+        )
 
-        # 如果没有指定字号则使用默认字号
+    @micropython.native
+    def layout(
+        self,
+        string: str,
+        x: int = 0,
+        y: int = 0,
+        font_size: int | None = None,
+        half_char: bool = True,
+        wrap_width: int | None = None,
+        line_spacing: int = 0,
+        proportional: bool = False,
+    ) -> Layout:
+        """
+        排版字符串，只计算每个字符的位置，不读取点阵也不绘制
+
+        Args:
+            string: 显示文字
+            x: 字符串左上角 x 轴坐标
+            y: 字符串左上角 y 轴坐标
+            font_size: 字号大小
+            half_char: 半宽显示 ASCII 字符
+            wrap_width: 自动换行的右边界(通常为屏幕宽度)，为 None 时不换行
+            line_spacing: 行间距
+            proportional: 按字体中的字符度量排版(需要字体包含度量表)，忽略 half_char
+
+        Returns:
+            Layout，可以保存下来由 render() 反复绘制
+        """
         font_size = self.font_size if font_size is None else font_size
         half_size = font_size // 2
-        # 与默认字号不同的字号将引发放缩
         font_resize = font_size != self.font_size
+        auto_wrap = wrap_width is not None
+        width = wrap_width
+        proportional = proportional and self.has_metrics
         # 记录初始的 x 位置
         initial_x = x
 
+        glyphs = array("h")
+        left = top = right = bottom = 0
+        empty = True
+        for code in map(ord, string):
+            # 按度量排版时，步进宽度与墨迹宽度需要跟随字号放缩
+            if proportional and code >= _MIN_PRINTABLE_CODE:
+                metrics = self.get_metrics(code)
+                if metrics is None:
+                    advance = ink_width = font_size
+                elif font_resize:
+                    advance = ceildiv(metrics[0] * font_size, self.font_size)
+                    ink_width = ceildiv(metrics[1] * font_size, self.font_size)
+                else:
+                    advance, ink_width = metrics
+                if auto_wrap and x + advance > width:
+                    y += font_size + line_spacing
+                    x = initial_x
+            elif auto_wrap and (
+                (half_char and code < _MAX_ASCII and x + half_size > width)
+                or ((not half_char or code > _MAX_ASCII) and x + font_size > width)
+            ):
+                y += font_size + line_spacing
+                x = initial_x
+
+            # 对控制字符的处理
+            if code == _LF_CODE:
+                y += font_size + line_spacing
+                x = initial_x
+                continue
+            elif code == _TAB_CODE:
+                x = ((x // font_size) + 1) * font_size + initial_x % font_size
+                continue
+            elif code < _MIN_PRINTABLE_CODE:
+                continue
+
+            if not proportional:
+                # 英文字符半格显示
+                advance = half_size if half_char and code < _MAX_ASCII else font_size
+
+            # 范围包含空白字符的步进宽度，便于居中、右对齐
+            if empty:
+                left = x
+                top = y
+                right = x + advance
+                bottom = y + font_size
+                empty = False
+            else:
+                if x < left:
+                    left = x
+                if y < top:
+                    top = y
+                if x + advance > right:
+                    right = x + advance
+                if y + font_size > bottom:
+                    bottom = y + font_size
+
+            # 没有墨迹的字符(如空格)只需要前进
+            if (not proportional or ink_width) and (
+                _INT16_MIN <= x <= _INT16_MAX and _INT16_MIN <= y <= _INT16_MAX
+            ):
+                # 码点按 int16 存放
+                glyphs.append((code ^ 0x8000) - 0x8000 if code <= _NONCHARACTER else -1)
+                glyphs.append(x)
+                glyphs.append(y)
+                glyphs.append(ink_width if proportional else font_size)
+            x += advance
+
+        return Layout(string, font_size, glyphs, (left, top, right - left, bottom - top))
+
+    @micropython.native
+    def render(
+        self,
+        display,
+        layout: Layout,
+        x: int = 0,
+        y: int = 0,
+        color: int = 0xFFFF,
+        bg_color: int = 0,
+        show: bool = True,
+        clear: bool = False,
+        alpha_color: int = 0,
+        reverse: bool = False,
+        color_type: int = -1,
+        prefetch: bool = False,
+    ):
+        """
+        按 layout() 的排版结果绘制，同一个排版可以在多帧中反复绘制
+
+        Args:
+            display: 显示对象
+            layout: layout() 的返回值
+            x: 整体的 x 轴偏移
+            y: 整体的 y 轴偏移
+            color: 字体颜色(RGB565)
+            bg_color: 字体背景颜色(RGB565)
+            show: 实时显示
+            clear: 清除之前显示内容
+            alpha_color: 透明色(RGB565) 当颜色与 alpha_color 相同时则透明
+            reverse: 反色(MONO)
+            color_type: 色彩模式 0:MONO 1:RGB565
+            prefetch: 预先批量读取整个字符串的点阵，适合长文本
+
+        Returns:
+            绘制时改动过的屏幕范围 (x, y, 宽, 高)，已裁剪到屏幕内，没有绘制时宽高为 0，
+            可以交给驱动只刷新这一部分(如 ST77XX.mark_dirty)
+        """
+        width = display.width
+        height = display.height
+
+        font_size = layout.font_size
+        # 与默认字号不同的字号将引发放缩
+        font_resize = font_size != self.font_size
         # 自动判断颜色类型
         if color_type == -1 and (width * height) > len(display.buffer):
             color_type = 0
@@ -171,10 +1053,12 @@ class BMFont:
         )
 
         # 构建调色板
+        invert = 0
         if color_type == 0:
             palette = framebuf.FrameBuffer(bytearray(2), 2, 1, framebuf.MONO_HLSB)
             # 处理黑白屏幕背景反转(反色)，反转调色板的颜色即可
             if reverse or color == 0 != bg_color:
+                invert = 1
                 palette.pixel(0, 0, 1)
                 alpha_color = -1
             else:
@@ -185,69 +1069,285 @@ class BMFont:
             palette.pixel(1, 0, color)
 
         # 构建FrameBuffer
-        # 给放缩模式提前构建FrameBuffer并不会提升速度
-        # 因为显示文字前需要擦除原有内容，重新申请一块内存速度更快
-        if not font_resize:
-            framebuf_ = framebuf.FrameBuffer(
-                bitmap_cache, font_size, font_size, framebuf.MONO_HLSB
+        # 放缩模式下放缩后的点阵整块复制到 glyph_buff，不需要擦除，可以提前构建
+        glyph_buff = (
+            bytearray(ceildiv(font_size, 8) * font_size) if font_resize else bitmap_cache
+        )
+        framebuf_ = framebuf.FrameBuffer(
+            glyph_buff, font_size, font_size, framebuf.MONO_HLSB
+        )
+        # 放缩后的点阵按 (字号 << 16 | 码点) 缓存
+        scaled_cache = self.scaled_cache if font_resize else None
+
+        # MONO_VLSB 屏幕(如 SSD1306)使用按页排列的点阵缓存，绘制方式由调色板与透明色决定
+        #   反色: 不透明，写入取反的点阵
+        #   背景透明: 与帧缓存按位或，需要 Viper 支持，否则仍使用 blit
+        #   不透明: 直接写入
+        display_format = getattr(display, "format", None)
+        vlsb_op = 0
+        vlsb_cache = self.vlsb_cache
+        if (
+            vlsb_cache is not None
+            and color_type == 0
+            and display_format == framebuf.MONO_VLSB
+        ):
+            if invert:
+                vlsb_op = _DIRECT_COPY
+            elif alpha_color == 0:
+                vlsb_op = _DIRECT_OR if _viper_or_pages is not None else 0
+            elif alpha_color != 1:
+                vlsb_op = _DIRECT_COPY
+        # 缓存键: 反色 << 24 | 字号 << 16 | 码点
+        vlsb_key = (invert << 24) | (font_size << 16)
+
+        # MONO_HLSB 屏幕(如墨水屏)与点阵格式相同，x 按字节对齐时按行直接写入
+        #   不透明时按行切片复制，反色与背景透明需要 Viper 支持，否则仍使用 blit
+        hlsb_op = 0
+        if color_type == 0 and display_format == framebuf.MONO_HLSB:
+            if invert:
+                hlsb_op = _DIRECT_INVERT if _viper_hlsb_rows is not None else 0
+            elif alpha_color == 0:
+                hlsb_op = _DIRECT_OR if _viper_hlsb_rows is not None else 0
+            elif alpha_color != 1:
+                hlsb_op = _DIRECT_COPY
+
+        # RGB565 帧缓存(每像素 2 字节，行跨度等于屏幕宽度)可以由 Viper 内核直接写入
+        blit_params = None
+        if (
+            _viper_blit_rgb565 is not None
+            and color_type == 1
+            and len(display.buffer) == width * height * 2
+        ):
+            blit_params = array(
+                "I",
+                (
+                    width,
+                    height,
+                    0,
+                    0,
+                    font_size,
+                    font_size,
+                    ceildiv(font_size, 8),
+                    color,
+                    bg_color,
+                    (color != alpha_color) | (bg_color != alpha_color) << 1,
+                ),
             )
 
-        for code in map(ord, string):
-            if auto_wrap and (
-                (half_char and code < _MAX_ASCII and x + half_size > width)
-                or ((not half_char or code > _MAX_ASCII) and x + font_size > width)
-            ):
-                y += font_size + line_spacing
-                x = initial_x
+        # RGB565 屏幕按 (字体颜色, 背景颜色) 缓存展开后的点阵，绘制时不再经过调色板
+        #   缓存键: 颜色组合序号 << 24 | 字号 << 16 | 码点
+        #   两种颜色都不是透明色时没有透明像素，可以按行整块复制
+        rgb565_cache = self.rgb565_cache if color_type == 1 else None
+        if rgb565_cache is not None:
+            pairs = self._rgb565_pairs
+            pair = (color << 16) | bg_color
+            pair_id = pairs.get(pair)
+            if pair_id is None:
+                if len(pairs) >= _RGB565_PAIR_LIMIT:
+                    pairs.clear()
+                    rgb565_cache.clear()
+                pair_id = pairs[pair] = len(pairs)
+            rgb565_key = (pair_id << 24) | (font_size << 16)
+            rgb565_alpha = (
+                alpha_color if color == alpha_color or bg_color == alpha_color else -1
+            )
+            rgb565_direct = len(display.buffer) == width * height * 2
 
-            # 对控制字符的处理
-            if code == _LF_CODE:
-                y += font_size + line_spacing
-                x = initial_x
-                continue
-            elif code == _TAB_CODE:
-                x = ((x // font_size) + 1) * font_size + initial_x % font_size
-                continue
-            elif code < _MIN_PRINTABLE_CODE:
-                continue
+        if _PROFILE:
+            t = utime.ticks_us()
+        prefetched = self.fetch_bitmaps(layout.string) if prefetch else None
+        if _PROFILE and prefetch:
+            self._profile(_PHASE_READ, t)
+        ink_framebufs = self._ink_framebufs if self.bitmap_cache is not None else {}
+
+        # 排版结果整体偏移
+        dx = x
+        dy = y
+        # 绘制过的范围
+        left = width
+        top = height
+        right = bottom = 0
+        glyphs = layout.glyphs
+        for i in range(0, len(glyphs), 4):
+            code = glyphs[i] & 0xFFFF
+            x = glyphs[i + 1] + dx
+            y = glyphs[i + 2] + dy
+            glyph_width = glyphs[i + 3]
 
             # 超过范围的字符不会显示*
             if x > width or y > height:
                 continue
 
-            # 获取字体的点阵数据
-            self.fast_get_bitmap(code, bitmap_cache)
+            if x < left:
+                left = x
+            if y < top:
+                top = y
+            if x + glyph_width > right:
+                right = x + glyph_width
+            if y + font_size > bottom:
+                bottom = y + font_size
 
-            # 由于颜色参数提前决定了调色板
-            # 这里按照放缩/无放缩进行显示即可
-            if font_resize:
-                display.blit(
-                    framebuf.FrameBuffer(
-                        self._fast_bitmap_resize(
-                            bitmap_cache, font_size, self.font_size
-                        ),
-                        font_size,
+            # MONO_VLSB 屏幕上 y 按页对齐时，命中按页排列的点阵缓存后直接写入帧缓存
+            vlsb_draw = vlsb_op and y >= 0 and not y & 7
+            if vlsb_draw:
+                vlsb = vlsb_cache.get(vlsb_key | code)
+                if vlsb is not None:
+                    if _PROFILE:
+                        t = utime.ticks_us()
+                    _blit_vlsb(display, vlsb, x, y, glyph_width, font_size, vlsb_op)
+                    if _PROFILE:
+                        self._profile(_PHASE_BLIT, t)
+                    continue
+
+            # RGB565 屏幕命中展开后的点阵时直接写入
+            if rgb565_cache is not None:
+                pixels = rgb565_cache.get(rgb565_key | code)
+                if pixels is not None:
+                    if _PROFILE:
+                        t = utime.ticks_us()
+                    _blit_rgb565(
+                        display,
+                        pixels,
+                        x,
+                        y,
+                        glyph_width,
                         font_size,
-                        framebuf.MONO_HLSB,
-                    ),
+                        rgb565_alpha,
+                        rgb565_direct,
+                    )
+                    if _PROFILE:
+                        self._profile(_PHASE_BLIT, t)
+                    continue
+
+            # 放缩模式先查询已放缩的点阵
+            scaled = None
+            if scaled_cache is not None:
+                scaled = scaled_cache.get((font_size << 16) | code)
+
+            if scaled is not None:
+                bitmap = scaled
+            else:
+                # 获取字体的点阵数据
+                # 紧凑内存模式下得到的是字体数据的切片，不会复制到点阵缓存
+                bitmap = None if prefetched is None else prefetched.get(code)
+                if bitmap is None:
+                    bitmap = self.fast_get_bitmap(code, bitmap_cache)
+                elif not self.packed_mem:
+                    bitmap_cache[:] = bitmap
+                    bitmap = bitmap_cache
+
+                if font_resize:
+                    if _PROFILE:
+                        t = utime.ticks_us()
+                    bitmap = self._fast_bitmap_resize(
+                        bitmap, font_size, self.font_size, glyph_buff
+                    )
+                    if _PROFILE:
+                        self._profile(_PHASE_RESIZE, t)
+                    if scaled_cache is not None:
+                        scaled_cache.put((font_size << 16) | code, bytes(glyph_buff))
+
+            if scaled is not None:
+                glyph_buff[:] = scaled
+                bitmap = glyph_buff
+
+            if vlsb_draw:
+                vlsb = _hlsb_to_vlsb(bitmap, font_size, invert)
+                vlsb_cache.put(vlsb_key | code, vlsb)
+                if _PROFILE:
+                    t = utime.ticks_us()
+                _blit_vlsb(display, vlsb, x, y, glyph_width, font_size, vlsb_op)
+                if _PROFILE:
+                    self._profile(_PHASE_BLIT, t)
+                continue
+
+            if rgb565_cache is not None:
+                pixels = _expand_rgb565(bitmap, font_size, palette)
+                rgb565_cache.put(rgb565_key | code, pixels)
+                if _PROFILE:
+                    t = utime.ticks_us()
+                _blit_rgb565(
+                    display,
+                    pixels,
                     x,
                     y,
-                    alpha_color,
-                    palette,
+                    glyph_width,
+                    font_size,
+                    rgb565_alpha,
+                    rgb565_direct,
                 )
-            else:
-                display.blit(framebuf_, x, y, alpha_color, palette)
+                if _PROFILE:
+                    self._profile(_PHASE_BLIT, t)
+                continue
+
+            if hlsb_op and x >= 0 and not x & 7:
+                if _PROFILE:
+                    t = utime.ticks_us()
+                _blit_hlsb(display, bitmap, x, y, glyph_width, font_size, hlsb_op)
+                if _PROFILE:
+                    self._profile(_PHASE_BLIT, t)
+                continue
 
-            # 英文字符半格显示
-            if half_char and code < _MAX_ASCII:
-                x += half_size
+            if blit_params is not None:
+                # 直接展开到 RGB565 帧缓存，不经过 FrameBuffer 与调色板
+                if _PROFILE:
+                    t = utime.ticks_us()
+                blit_params[2] = x + _VIPER_COORD_BIAS
+                blit_params[3] = y + _VIPER_COORD_BIAS
+                blit_params[4] = glyph_width
+                _viper_blit_rgb565(bitmap, display.buffer, blit_params)
+                if _PROFILE:
+                    self._profile(_PHASE_BLIT, t)
+                continue
+
+            # 由于颜色参数提前决定了调色板
+            # 这里按照放缩/无放缩进行显示即可
+            if glyph_width != font_size:
+                # 只绘制有墨迹的列，行跨度仍为完整字宽
+                fb = None
+                if bitmap is bitmap_cache:
+                    fb = ink_framebufs.get(glyph_width)
+                    if fb is None:
+                        fb = framebuf.FrameBuffer(
+                            bitmap_cache,
+                            glyph_width,
+                            font_size,
+                            framebuf.MONO_HLSB,
+                            font_size,
+                        )
+                        ink_framebufs[glyph_width] = fb
+                if fb is None:
+                    fb = framebuf.FrameBuffer(
+                        bitmap, glyph_width, font_size, framebuf.MONO_HLSB, font_size
+                    )
+            elif bitmap is glyph_buff:
+                fb = framebuf_
             else:
-                x += font_size
+                fb = framebuf.FrameBuffer(bitmap, font_size, font_size, framebuf.MONO_HLSB)
+            if _PROFILE:
+                t = utime.ticks_us()
+            display.blit(fb, x, y, alpha_color, palette)
+            if _PROFILE:
+                self._profile(_PHASE_BLIT, t)
 
-        display.show() if show else 0
+        if show:
+            if _PROFILE:
+                t = utime.ticks_us()
+            display.show()
+            if _PROFILE:
+                self._profile(_PHASE_SHOW, t)
+
+        if clear:
+            return 0, 0, width, height
+        left = max(left, 0)
+        top = max(top, 0)
+        right = min(right, width)
+        bottom = min(bottom, height)
+        if right <= left or bottom <= top:
+            return 0, 0, 0, 0
+        return left, top, right - left, bottom - top
 
     # @micropython.native
-    @timed_function
     def _fast_get_index(self, code: int) -> int:
         """
         获取索引，利用分块加速二分收敛速度
@@ -260,6 +1360,26 @@ class BMFont:
         # 超出范围直接返回
         if not (self.font_begin <= code <= self.font_end):
             return -1
+
+        # v4 字体按码点区间查找
+        if self.version == 4:
+            return self._run_get_index(code)
+
+        # 秩索引：一次位测试判断字符是否存在，再由前缀计数得到索引
+        if self.rank_index is not None:
+            for b, e, bits, prefix, base in self.rank_index:
+                if b <= code <= e:
+                    offset = code - b
+                    byte_index = offset >> 3
+                    bit = offset & 7
+                    if not (bits[byte_index] >> bit) & 1:
+                        return -1
+                    popcount = self._popcount
+                    rank = prefix[offset >> 5]
+                    for i in range((offset >> 5) << 2, byte_index):
+                        rank += popcount[bits[i]]
+                    return base + rank + popcount[bits[byte_index] & ((1 << bit) - 1)]
+
         font = self.font
         start = _HEADER_LEN
         end = self.start_bitmap
@@ -276,7 +1396,8 @@ class BMFont:
             end = (end - _HEADER_LEN) // 2
             while start <= end:
                 mid = (start + end) >> 1
-                target_code = cache[mid]
+                # 索引为大端序，直接在原始字节上解码，不创建中间对象
+                target_code = (cache[mid << 1] << 8) | cache[(mid << 1) + 1]
                 if code == target_code:
                     return mid
                 elif code < target_code:
@@ -331,60 +1452,31 @@ class BMFont:
     # 整数倍放大 (假设scale=2)
     # 版本1(6ms): 先扩散bit 0b101->0b10_00_10 然后移位插值 0b11_00_11 最后复制到相应行
     # 版本2(4.5ms): 求放大掩码 0b11 插值 0b11_00_11 最后复制到相应行
-    # 挨个处理像素太慢了，需要使用向量矩阵算法提高速度
+    # 版本3: 按 (原字号, 新字号) 预先计算 ResizePlan，逐字节查表，见 ResizePlan
     # @timed_function
     def _fast_bitmap_resize(
-        self, byte_data: bytearray, new_size: int, old_size: int
+        self, byte_data: bytearray, new_size: int, old_size: int, out=None
     ) -> bytearray:
-        len_ = len(byte_data)
-        row_bytes = ceildiv(old_size, 8)
-        new_row_bytes = ceildiv(new_size, 8)
-        alignment = 8 * row_bytes - old_size
-        realignment = 8 * new_row_bytes - new_size  # 还要再对齐回来
-        new_bitmap = bytearray(new_row_bytes * new_size)
-        # 拿到原始二进制数据
-        binary_data = [
-            int.from_bytes(byte_data[offset : offset + row_bytes], "big") >> alignment
-            for offset in range(0, len_, row_bytes)
-        ]
-        new_offset = 0
-        if (new_size % old_size) == 0 and new_size > old_size:
-            scale = new_size // old_size
-            scale_mask = (0x01 << scale) - 1
-            bitmask_shift = [
-                (0x01 << reversed_col, reversed_col * scale)
-                for reversed_col in reversed(range(old_size))
-            ]
-            for row_data in binary_data:
-                # 列插值
-                new_row_data = 0
-                for mask, shift in bitmask_shift:
-                    if (row_data & mask) != 0:
-                        new_row_data |= scale_mask << shift
-                new_row_data = (new_row_data << realignment).to_bytes(
-                    new_row_bytes, "big"
-                )
-                # 行插值
-                for _ in range(scale):
-                    new_bitmap[new_offset : new_offset + new_row_bytes] = new_row_data
-                    new_offset += new_row_bytes
-        else:
-            # 定点数放大1024倍，不会真的有人需要缩放1024多倍吧🤔，应该不用担心精度问题。
-            scale_fixed = int((old_size << 10) / new_size)  # 定点数放大 1024 倍
-
-            old_xy_indices = [(new_x * scale_fixed) >> 10 for new_x in range(new_size)]
-            mask_table = [old_size - 1 - x for x in range(old_size)]
-            for old_y in old_xy_indices:
-                new_row_data = 0
-                row_data = binary_data[old_y]
-                for old_x in old_xy_indices:
-                    bit_value = (row_data >> mask_table[old_x]) & 1
-                    new_row_data = (new_row_data << 1) | bit_value
-                new_bitmap[new_offset : new_offset + new_row_bytes] = (
-                    new_row_data << realignment
-                ).to_bytes(new_row_bytes, "big")
-                new_offset += new_row_bytes
-        return new_bitmap
+        """
+        邻近插值放缩点阵
+
+        Args:
+            byte_data: 原字号的点阵
+            new_size: 新字号
+            old_size: 原字号
+            out: 输出缓冲区，为 None 时新建
+
+        Returns:
+            放缩后的点阵
+        """
+        plan = _last_resize_plan
+        if plan is None or plan.old_size != old_size or plan.new_size != new_size:
+            plan = _resize_plan(old_size, new_size)
+        if out is None:
+            out = bytearray(plan.out_size)
+        if _viper_resize is not None:
+            return _viper_resize(plan, byte_data, out)
+        return plan.resize(byte_data, out)
 
     # @timed_function
     def fast_get_bitmap(self, code: int, buff: bytearray):
@@ -392,30 +1484,588 @@ class BMFont:
 
         Args:
             code: 字符对应码点，使用ord(str)得到.
+            buff: 点阵缓存
+
+        Returns:
+            存放点阵数据的缓冲区，紧凑内存模式下为字体数据的 memoryview 切片，其余情况为 buff
         """
-        if self.load_into_mem:
+        if code in self._missing_codes:
+            self.missing_cache_hits += 1
+            return self._fill_missing(code, buff)
+        if self.load_into_mem and not self.packed_mem:
+            return self._read_bitmap(code, -1, buff)
+
+        glyph_cache = self.glyph_cache
+        if glyph_cache is not None:
+            bitmap = glyph_cache.get(code)
+            if bitmap is not None:
+                buff[:] = bitmap
+                return buff
+
+        if _PROFILE:
+            t = utime.ticks_us()
+        index = self._fast_get_index(code)
+        if _PROFILE:
+            self._profile(_PHASE_INDEX, t)
+        if index == -1:
+            return self._fill_missing(code, buff)
+        if _PROFILE:
+            t = utime.ticks_us()
+            bitmap = self._read_bitmap(code, index, buff)
+            self._profile(_PHASE_READ, t)
+            return bitmap
+        return self._read_bitmap(code, index, buff)
+
+    def _profile(self, phase: int, t: int):
+        """累计某个阶段的调用次数与耗时，只在 _PROFILE 开启时被调用"""
+        self.phase_calls[phase] += 1
+        self.phase_us[phase] += utime.ticks_diff(utime.ticks_us(), t)
+
+    def stats(self) -> dict:
+        """
+        返回各阶段的累计调用次数与耗时
+
+        Returns:
+            {阶段: (调用次数, 耗时us)}，阶段依次为 索引查询、点阵读取、放缩、blit、刷新屏幕。
+            需要将 _PROFILE 改为 1，否则全部为 0
+        """
+        return {
+            name: (self.phase_calls[phase], self.phase_us[phase])
+            for phase, name in enumerate(_PHASE_NAMES)
+        }
+
+    def reset_stats(self):
+        """清零各阶段的统计"""
+        self.phase_calls = [0] * len(_PHASE_NAMES)
+        self.phase_us = [0] * len(_PHASE_NAMES)
+
+    def _fill_missing(self, code: int, buff: bytearray):
+        """
+        记录缺失字符并将替代点阵复制到 buff
+        缺失的码点会进入缺失字符缓存，下次不再查询索引
+        """
+        self.missing_count += 1
+        missing_codes = self._missing_codes
+        if code not in missing_codes:
+            if len(missing_codes) >= _MISSING_CACHE_SIZE:
+                missing_codes.clear()
+            missing_codes.add(code)
+        glyph = self.missing_glyph
+        if glyph is None:
+            glyph = self._build_missing_glyph()
+        if len(buff) == len(glyph):
+            buff[:] = glyph
+        else:
+            size = min(len(buff), len(glyph))
+            buff[:size] = glyph[:size]
+        return buff
+
+    def _build_missing_glyph(self) -> bytes:
+        """
+        生成缺失字符的替代点阵，在第一次遇到缺失字符时调用
+        指定了替代字符且字体中存在时使用它的点阵，否则为实心像素块
+        """
+        glyph = None
+        code = self._missing_glyph_code
+        if code is not None:
+            if self.load_into_mem and not self.packed_mem:
+                glyph = self.all_font_data.get(code, None)
+            else:
+                index = self._fast_get_index(code)
+                if index != -1:
+                    glyph = bytes(self._read_bitmap(code, index, bytearray(self.bitmap_size)))
+        if glyph is None:
+            glyph = b"\xff" * self.bitmap_size
+        self.missing_glyph = glyph
+        return glyph
+
+    def missing_stats(self) -> dict:
+        """返回缺失字符的请求次数、其中命中缺失字符缓存的次数以及缓存中的码点数"""
+        return {
+            "missing": self.missing_count,
+            "cache_hits": self.missing_cache_hits,
+            "entries": len(self._missing_codes),
+        }
+
+    def _read_bitmap(self, code: int, index: int, buff: bytearray):
+        """
+        按已知的索引读取点阵，不查询 LRU 缓存(读取后仍会写入缓存)
+
+        Args:
+            code: 字符对应码点，字典模式按码点查找
+            index: 字符在字体文件中的索引
+            buff: 点阵缓存
+
+        Returns:
+            同 fast_get_bitmap
+        """
+        if self.packed_mem:
+            offset = index * self.bitmap_size
+            return self.font_arena[offset : offset + self.bitmap_size]
+        elif self.load_into_mem:
             bitmap = self.all_font_data.get(code, None)
             if bitmap is None:
-                print("未找到字符: ", code)
-                # 这里不要使用固定长度数据，可能引起buff大小变化
-                # 字体缺失生成一个实心像素块
-                for i in range(len(buff)):
-                    buff[i] = 0xFF
-                return
+                return self._fill_missing(code, buff)
             if len(buff) < self.bitmap_size:
                 buff[:] = bitmap[: len(buff)]
             else:
                 buff[: self.bitmap_size] = bitmap
+            return buff
+
+        glyph_cache = self.glyph_cache
+        if self.compressed:
+            self._read_compressed(index, buff)
+            if glyph_cache is not None:
+                glyph_cache.put(code, bytes(buff))
+            return buff
+
+        offset = self.start_bitmap + index * self.bitmap_size
+        if self.font_data is not None:
+            # 字体数据位于缓冲区中，直接切片复制，不经过文件接口
+            buff[:] = self.font_data[offset : offset + len(buff)]
+            return buff
+        self.font.seek(offset, 0)
+        self.font.readinto(buff)
+        if glyph_cache is not None:
+            glyph_cache.put(code, bytes(buff))
+        return buff
+
+    def get_metrics(self, code: int):
+        """
+        获取字符度量
+
+        Args:
+            code: 字符对应码点
+
+        Returns:
+            (步进宽度, 墨迹宽度)，字体不包含度量表或字符不存在时返回 None
+        """
+        if not self.has_metrics or code in self._missing_codes:
+            return None
+        index = self._fast_get_index(code)
+        if index == -1:
+            return None
+        if self.glyph_metrics is not None:
+            return self.glyph_metrics[index * 2], self.glyph_metrics[index * 2 + 1]
+        self.font.seek(self.metrics_table + index * 2, 0)
+        metrics = self.font.read(2)
+        return metrics[0], metrics[1]
+
+    def _read_compressed(self, index: int, buff):
+        """
+        读取并解码压缩字体中第 index 个字符的点阵
+        每个字符的记录长度为 0 表示未压缩，否则记录为 行掩码 + 新出现的行，
+        行掩码中为 0 的行与上一行相同(第一行之前视为空行)
+        """
+        font = self.font
+        bitmap_size = self.bitmap_size
+        first = (index >> _GLYPH_GROUP_SHIFT) << _GLYPH_GROUP_SHIFT
+        offset = self.group_offsets[index >> _GLYPH_GROUP_SHIFT]
+        if self.glyph_lengths is not None:
+            lengths = self.glyph_lengths[first : index + 1]
         else:
-            index = self._fast_get_index(code)
-            if index == -1:
-                print("未找到字符: ", code)
-                for i in range(len(buff)):
-                    buff[i] = 0xFF
-                return
+            font.seek(self.length_table + first, 0)
+            lengths = font.read(index - first + 1)
+        for i in range(index - first):
+            offset += lengths[i] or bitmap_size
+        length = lengths[-1]
+
+        font.seek(self.start_bitmap + offset, 0)
+        if length == 0:
+            font.readinto(buff)
+            return
+        record = font.read(length)
+        row_bytes = ceildiv(self.font_size, 8)
+        mask_len = ceildiv(bitmap_size // row_bytes, 8)
+        mask = int.from_bytes(record[:mask_len], "little")
+        pos = mask_len
+        out = 0
+        while out < bitmap_size:
+            if mask & 1:
+                buff[out : out + row_bytes] = record[pos : pos + row_bytes]
+                pos += row_bytes
+            elif out == 0:
+                for i in range(row_bytes):
+                    buff[i] = 0
+            else:
+                buff[out : out + row_bytes] = buff[out - row_bytes : out]
+            mask >>= 1
+            out += row_bytes
+
+    def _run_field(self, i: int) -> int:
+        """读取 v4 区间索引中的第 i 个 uint16"""
+        if self.run_index is not None:
+            return self.run_index[i]
+        if self.font_data is not None:
+            i = _HEADER_LEN + i * 2
+            return self.font_data[i] | (self.font_data[i + 1] << 8)
+        self.font.seek(_HEADER_LEN + i * 2, 0)
+        return struct.unpack("<H", self.font.read(2))[0]
+
+    def _run_get_index(self, code: int) -> int:
+        """
+        v4 字体获取索引，二分查找起始码点不大于 code 的最后一个区间
+        Args:
+            code: 字符码点
+
+        Returns:
+            字符在字体文件中的索引，如果未找到则返回 -1
+        """
+        run_num = self.run_num
+        start = 0
+        end = run_num - 1
+        while start < end:
+            mid = (start + end + 1) >> 1
+            if self._run_field(mid) <= code:
+                start = mid
+            else:
+                end = mid - 1
+        offset = code - self._run_field(start)
+        if offset < self._run_field(run_num + start):
+            return self._run_field(2 * run_num + start) + offset
+        return -1
+
+    def _iter_codes(self):
+        """按索引顺序依次产生字体中每个字符的码点"""
+        if self.version == 4:
+            run_num = self.run_num
+            for i in range(run_num):
+                begin = self._run_field(i)
+                for code in range(begin, begin + self._run_field(run_num + i)):
+                    yield code
+            return
+        word_index = 0
+        while word_index < self.word_num:
+            count = min(_BATCH_INDEX_WORDS, self.word_num - word_index)
+            self.font.seek(_HEADER_LEN + word_index * 2, 0)
+            for code in struct.unpack(f">{count}H", self.font.read(count * 2)):
+                yield code
+            word_index += count
+
+    def _iter_runs(self):
+        """按索引顺序产生字体中的连续码点区间 (起始码点, 区间长度, 首字符索引)"""
+        if self.version == 4:
+            run_num = self.run_num
+            for i in range(run_num):
+                yield self._run_field(i), self._run_field(run_num + i), self._run_field(
+                    2 * run_num + i
+                )
+            return
+        begin = length = first = 0
+        for index, code in enumerate(self._iter_codes()):
+            if length and begin + length == code:
+                length += 1
+                continue
+            if length:
+                yield begin, length, first
+            begin, length, first = code, 1, index
+        if length:
+            yield begin, length, first
+
+    def _index_code(self, index: int) -> int:
+        """读取索引中第 index 个字符的码点"""
+        if self.enable_mem_index:
+            cache = self.font_index_cache
+            return (cache[index << 1] << 8) | cache[(index << 1) + 1]
+        self.font.seek(_HEADER_LEN + index * 2, 0)
+        return struct.unpack(">H", self.font.read(2))[0]
+
+    def _index_lower_bound(self, code: int, start: int) -> int:
+        """在 [start, word_num) 中查找第一个码点不小于 code 的索引"""
+        end = self.word_num
+        while start < end:
+            mid = (start + end) >> 1
+            if self._index_code(mid) < code:
+                start = mid + 1
+            else:
+                end = mid
+        return start
+
+    def _batch_get_index(self, codes: list) -> list:
+        """
+        按码点顺序一次性查询多个字符的索引
+        Args:
+            codes: 已排序且去重的码点
+
+        Returns:
+            [(码点, 索引), ...] 按索引升序排列，未找到的字符不会出现在结果中
+        """
+        result = []
+        word_num = self.word_num
+        if self.version == 4:
+            for code in codes:
+                index = self._fast_get_index(code)
+                if index != -1:
+                    result.append((code, index))
+            return result
+
+        if self.enable_mem_index:
+            pos = 0
+            for code in codes:
+                if not (self.font_begin <= code <= self.font_end):
+                    continue
+                pos = self._index_lower_bound(code, pos)
+                if self._index_code(pos) == code:
+                    result.append((code, pos))
+            return result
+
+        # 当前窗口内的码点，窗口覆盖索引 [window_start, window_start + len(window))
+        window = ()
+        window_start = 0
+        pos = 0
+        for code in codes:
+            if not (self.font_begin <= code <= self.font_end):
+                continue
+            # 码点超出当前窗口，二分定位后重新读取一段索引
+            if pos >= len(window) or window[-1] < code:
+                window_start = self._index_lower_bound(code, window_start + pos)
+                count = min(_BATCH_INDEX_WORDS, word_num - window_start)
+                self.font.seek(_HEADER_LEN + window_start * 2, 0)
+                window = struct.unpack(f">{count}H", self.font.read(count * 2))
+                pos = 0
+            # 在窗口内顺序前进
+            while window[pos] < code:
+                pos += 1
+            if window[pos] == code:
+                result.append((code, window_start + pos))
+        return result
+
+    def fetch_bitmaps(self, string: str) -> dict:
+        """
+        批量获取字符串中所有字符的点阵数据
+        先按码点排序一次性查询索引，再按文件顺序读取点阵，相邻的点阵合并为一次读取
+
+        Args:
+            string: 需要获取点阵的字符串
+
+        Returns:
+            {码点: 点阵数据}，未找到的字符不会出现在结果中
+        """
+        codes = sorted(set(code for code in map(ord, string) if code >= _MIN_PRINTABLE_CODE))
+        bitmap_size = self.bitmap_size
+        if self.packed_mem:
+            arena = self.font_arena
+            return {
+                code: arena[index * bitmap_size : (index + 1) * bitmap_size]
+                for code, index in self._batch_get_index(codes)
+            }
+        if self.load_into_mem:
+            all_font_data = self.all_font_data
+            return {code: all_font_data[code] for code in codes if code in all_font_data}
+
+        if self.font_data is not None and not self.compressed:
+            font_data = self.font_data
+            return {
+                code: font_data[offset : offset + bitmap_size]
+                for code, offset in (
+                    (code, self.start_bitmap + index * bitmap_size)
+                    for code, index in self._batch_get_index(codes)
+                )
+            }
+
+        bitmaps = {}
+        glyph_cache = self.glyph_cache
+        if glyph_cache is not None:
+            missed = []
+            for code in codes:
+                bitmap = glyph_cache.get(code)
+                if bitmap is None:
+                    missed.append(code)
+                else:
+                    bitmaps[code] = bitmap
+            codes = missed
+
+        found = self._batch_get_index(codes)
+        if self.compressed:
+            # 压缩记录长度不一，逐个解码
+            for code, index in found:
+                bitmap = bytearray(bitmap_size)
+                self._read_compressed(index, bitmap)
+                bitmaps[code] = bitmap
+                if glyph_cache is not None:
+                    glyph_cache.put(code, bytes(bitmap))
+            return bitmaps
+
+        font = self.font
+        max_run = _BATCH_READ_LIMIT // bitmap_size
+        i = 0
+        while i < len(found):
+            # 合并相近的点阵记录
+            first_index = found[i][1]
+            j = i + 1
+            while (
+                j < len(found)
+                and found[j][1] - found[j - 1][1] <= _BATCH_MERGE_GAP
+                and found[j][1] - first_index < max_run
+            ):
+                j += 1
+            run = bytearray((found[j - 1][1] - first_index + 1) * bitmap_size)
+            font.seek(self.start_bitmap + first_index * bitmap_size, 0)
+            font.readinto(run)
+            for code, index in found[i:j]:
+                offset = (index - first_index) * bitmap_size
+                bitmap = bytes(run[offset : offset + bitmap_size])
+                bitmaps[code] = bitmap
+                if glyph_cache is not None:
+                    glyph_cache.put(code, bitmap)
+            i = j
+        return bitmaps
+
+    def _build_rank_index(self):
+        """
+        为 _UNICODE_BLOCK_RANGE 中的每个分块建立秩索引
+        每个码点占 1 bit 表示字符是否存在，每 32 bit 记录一次之前存在的字符数
+        CJK 分块的位图约 2.6 KByte，前缀表约 1.3 KByte
+        """
+        self._popcount = bytes(bin(i).count("1") for i in range(256))
+        blocks = []
+        for b, e in _UNICODE_BLOCK_RANGE:
+            if e < self.font_begin or b > self.font_end:
+                continue
+            blocks.append([b, e, bytearray(ceildiv(e - b + 1, 8)), None, -1])
 
-            self.font.seek(self.start_bitmap + index * self.bitmap_size, 0)
-            self.font.readinto(buff)
+        # 顺序扫描索引，标记存在的码点
+        font = self.font
+        font.seek(_HEADER_LEN, 0)
+        word_index = 0
+        while word_index < self.word_num:
+            count = min(_BATCH_INDEX_WORDS, self.word_num - word_index)
+            for word_code in struct.unpack(f">{count}H", font.read(count * 2)):
+                for block in blocks:
+                    if block[0] <= word_code <= block[1]:
+                        if block[4] == -1:
+                            block[4] = word_index
+                        offset = word_code - block[0]
+                        block[2][offset >> 3] |= 1 << (offset & 7)
+                        break
+                word_index += 1
+
+        self.rank_index = []
+        popcount = self._popcount
+        for b, e, bits, _, base in blocks:
+            if base == -1:
+                continue
+            prefix = array("H", range(ceildiv(len(bits), 4)))
+            rank = 0
+            for word in range(len(prefix)):
+                prefix[word] = rank
+                for byte in bits[word << 2 : (word + 1) << 2]:
+                    rank += popcount[byte]
+            self.rank_index.append((b, e, bits, prefix, base))
+        gc.collect()
+
+    def _build_block_boundary(self):
+        """扫描索引，记录 _UNICODE_BLOCK_RANGE 中每个分块在索引中的起止位置"""
+        self.block_boundary: list = [None for _ in range(3)]
+        font = self.font
+        block_num = len(_UNICODE_BLOCK_RANGE)
+        font.seek(_HEADER_LEN, 0)
+        len_ = 1000
+        not_eof = True
+        block = 0
+        find_start = False
+        start, end = 0, 0
+        while not_eof:
+            if len_ + font.tell() > self.start_bitmap:
+                len_ = self.start_bitmap - font.tell()
+                not_eof = False
+            tmp = struct.unpack(f">{len_//2}H", font.read(len_))
+            word_index = 0
+            for word_code in tmp:
+                # 注意：字体文件索引空间是线性的
+                # 第一次满足分块 就记录此时索引为分块起始索引
+                # 直到找到不满足分块的 记录索引为分块结束索引，然后找到其他分块的索引
+                for i, (b, e) in enumerate(_UNICODE_BLOCK_RANGE):
+                    if b <= word_code <= e:
+                        if find_start:
+                            break
+                        else:
+                            block = i
+                            find_start = True
+                            start = font.tell() - len_ + (word_index * 2)
+                            break
+                    elif find_start and i == block:
+                        end = font.tell() - len_ + (word_index * 2)
+                        find_start = False
+                        self.block_boundary[block] = (start, end)
+
+                if block == block_num:
+                    not_eof = False
+                    break
+                word_index += 1
+        if find_start:
+            self.block_boundary[block] = (start, self.start_bitmap)
+
+    def _load_meta(self) -> bool:
+        """
+        从元数据文件载入分块索引和秩索引
+        版本不符、没有文件尾标识(写入中断)，或字体文件的大小、修改时间、文件头与记录不一致时视为失效
+
+        Returns:
+            是否成功载入
+        """
+        try:
+            with open(self.meta_file, "rb") as f:
+                magic, meta_version, size, mtime = struct.unpack(">4sBII", f.read(13))
+                if (
+                    magic != _META_MAGIC
+                    or meta_version != _META_VERSION
+                    or (size, mtime) != self._font_stat()
+                    or f.read(_HEADER_LEN) != self.bmf_info
+                ):
+                    return False
+
+                block_boundary = []
+                for _ in range(f.read(1)[0]):
+                    start, end = struct.unpack(">II", f.read(8))
+                    block_boundary.append(None if start == 0 else (start, end))
+
+                rank_index = []
+                for _ in range(f.read(1)[0]):
+                    b, e, base, bits_len = struct.unpack(">HHHH", f.read(8))
+                    bits = bytearray(f.read(bits_len))
+                    prefix_len = ceildiv(bits_len, 4)
+                    prefix = array(
+                        "H", struct.unpack(f">{prefix_len}H", f.read(prefix_len * 2))
+                    )
+                    rank_index.append((b, e, bits, prefix, base))
+                if f.read(len(_META_MAGIC) + 1) != _META_MAGIC:
+                    return False
+        except (OSError, IndexError, ValueError):
+            return False
+
+        self.block_boundary = block_boundary or None
+        if rank_index:
+            self._popcount = bytes(bin(i).count("1") for i in range(256))
+            self.rank_index = rank_index
+        return True
+
+    def _save_meta(self):
+        """将分块索引和秩索引写入元数据文件，文件系统只读时忽略"""
+        block_boundary = self.block_boundary or ()
+        rank_index = self.rank_index or ()
+        try:
+            with open(self.meta_file, "wb") as f:
+                f.write(
+                    struct.pack(">4sBII", _META_MAGIC, _META_VERSION, *self._font_stat())
+                )
+                f.write(self.bmf_info)
+                f.write(bytes((len(block_boundary),)))
+                for boundary in block_boundary:
+                    f.write(struct.pack(">II", *(boundary or (0, 0))))
+                f.write(bytes((len(rank_index),)))
+                for b, e, bits, prefix, base in rank_index:
+                    f.write(struct.pack(">HHHH", b, e, base, len(bits)))
+                    f.write(bits)
+                    f.write(struct.pack(f">{len(prefix)}H", *prefix))
+                f.write(_META_MAGIC)
+        except OSError:
+            pass
+
+    def _font_stat(self) -> tuple:
+        """字体文件的大小与修改时间，用于判断元数据是否失效"""
+        stat = os.stat(self.font_file)
+        return stat[6], stat[8] & 0xFFFFFFFF
 
     def close_file(self):
         """关闭文件流。！！！在退出程序前必须手动调用"""
@@ -427,27 +2077,58 @@ class BMFont:
         enable_mem_index=False,
         enable_bitmap_cache=True,
         load_into_mem=False,
+        glyph_cache_size=0,
+        packed_mem=False,
+        rank_index=False,
+        meta_cache=False,
+        missing_glyph=None,
+        scaled_cache_size=0,
+        vlsb_cache_size=0,
+        rgb565_cache_size=0,
     ):
         """
         Args:
-            font_file: 字体文件路径
+            font_file: 字体文件路径，也可以是 bytes、bytearray、memoryview 等缓冲区对象(如冻结在固件中的字体模块)
             enable_mem_index: 启用内存索引，将索引信息全部载入内存，更快速，每个索引2字节，内存小的机器慎用
             enable_bitmap_cache: 启用点阵缓存，在类成员中申请bytearray对象，避免频繁创建
             load_in_mem: 载入全部字体数据到内存，如果开启则忽略内存索引、分块索引、索引缓存，内存小的机器慎用
+            glyph_cache_size: 字符点阵 LRU 缓存的字节预算，为 0 时不启用，load_into_mem 模式下无效
+            packed_mem: 与 load_into_mem 同时开启时，将全部点阵存放在一块连续内存中，按索引二分查找，获取点阵时不复制
+            rank_index: 启用秩索引，常用分块内的字符一次位测试即可得到索引，CJK 分块约占 4 KByte 内存
+            meta_cache: 将分块索引、秩索引保存到 字体文件路径+".meta"，之后启动时直接载入，字体文件变化时自动重建
+            missing_glyph: 缺失字符的替代显示，可以是字体中某个字符的码点(如 ord("?"))或 bitmap_size 字节的点阵，默认为实心像素块
+            scaled_cache_size: 放缩后点阵的 LRU 缓存字节预算，按 (字号, 码点) 缓存，为 0 时不启用
+            vlsb_cache_size: MONO_VLSB 屏幕(如 SSD1306)按页排列的点阵缓存字节预算，为 0 时不启用
+            rgb565_cache_size: RGB565 屏幕按 (字体颜色, 背景颜色) 展开的点阵缓存字节预算，16 像素的字符占 512 字节，为 0 时不启用
 
         """
         self.font_file = font_file
         # 载入字体文件
-        self.font = open(font_file, "rb")
+        #   缓冲区对象直接通过 memoryview 访问，冻结在固件中的 bytes 不会复制到内存
+        if isinstance(font_file, str):
+            self.font_data = None
+            self.font = open(font_file, "rb")
+        else:
+            self.font_data = memoryview(font_file)
+            self.font = _BufferFile(self.font_data)
+            font_file = "<buffer>"
         # 获取字体文件头
         #   字体文件头大小 16 byte ,按照顺序依次是
         #       2 byte 文件标识
         #       1 byte 版本号
         #       1 byte 映射方式
+        #   v3:
         #       3 byte 位图开始字节
         #       1 byte 字号
         #       1 byte 单字点阵字节大小
         #       7 byte 保留
+        #   v4(小端序):
+        #       4 byte 位图开始字节
+        #       1 byte 字号
+        #       1 byte 标志位
+        #       2 byte 单字点阵字节大小
+        #       2 byte 码点区间数量
+        #       2 byte 字符数量
         self.bmf_info = self.font.read(_HEADER_LEN)
 
         # 判断字体是否正确
@@ -455,24 +2136,104 @@ class BMFont:
         if self.bmf_info[0:2] != b"BM":
             raise TypeError("字体文件格式不正确: " + font_file)
         self.version = self.bmf_info[2]
-        if self.version != 3:
+        if self.version not in (3, 4):
             raise TypeError("字体文件版本不正确: " + str(self.version))
 
         # 目前映射方式并没有加以验证，原因是 MONO_HLSB 最易于处理
         self.map_mode = self.bmf_info[3]
 
-        # 位图数据位于文件尾，需要通过位图开始字节来确定字体数据实际位置
-        self.start_bitmap = struct.unpack(">I", b"\x00" + self.bmf_info[4:7])[0]
-        # 默认的文字字号，用于缩放方面的处理
-        self.font_size = self.bmf_info[7]
-        # 用来定位字体数据位置
-        self.bitmap_size = self.bmf_info[8]
+        if self.version == 3:
+            # 位图数据位于文件尾，需要通过位图开始字节来确定字体数据实际位置
+            self.start_bitmap = struct.unpack(">I", b"\x00" + self.bmf_info[4:7])[0]
+            # 默认的文字字号，用于缩放方面的处理
+            self.font_size = self.bmf_info[7]
+            # 用来定位字体数据位置
+            self.bitmap_size = self.bmf_info[8]
+            self.flags = 0
+            self.compressed = False
+
+            # 查询字体空间范围
+            self.font_begin = struct.unpack(">H", self.font.read(2))[0]
+            self.font.seek(self.start_bitmap - 2, 0)
+            self.font_end = struct.unpack(">H", self.font.read(2))[0]
+            word_num = (self.start_bitmap - _HEADER_LEN) // 2
+        else:
+            (
+                self.start_bitmap,
+                self.font_size,
+                self.flags,
+                self.bitmap_size,
+                self.run_num,
+                word_num,
+            ) = struct.unpack("<IBBHHH", self.bmf_info[4:])
+
+            # 区间索引依次为 起始码点[n] 区间长度[n] 首字符索引[n]，均为小端 uint16
+            # 区间较少时直接读入 array，无需逐个解析，缓冲区中的字体直接读取缓冲区
+            self.run_index = None
+            if self.font_data is None and (enable_mem_index or self.run_num <= _V4_RUNS_IN_MEM):
+                raw = bytearray(self.run_num * 6)
+                self.font.readinto(raw)
+                self.run_index = array("H", raw)
+                del raw
 
-        # 查询字体空间范围
-        self.font_begin = struct.unpack(">H", self.font.read(2))[0]
-        self.font.seek(self.start_bitmap - 2, 0)
-        self.font_end = struct.unpack(">H", self.font.read(2))[0]
-        word_num = (self.start_bitmap - _HEADER_LEN) // 2
+            # 区间索引之后依次是可选的表(均 4 字节对齐)
+            #   压缩点阵的定位表: 每组起始偏移 uint32[ceil(字符数量/32)]，每个字符的记录长度 uint8[字符数量]
+            #   字符度量表: 每个字符的 步进宽度 uint8 与 墨迹宽度 uint8
+            table_start = (_HEADER_LEN + self.run_num * 6 + 3) & ~3
+            self.compressed = bool(self.flags & _FLAG_COMPRESSED)
+            if self.compressed:
+                group_num = ceildiv(word_num, 1 << _GLYPH_GROUP_SHIFT)
+                self.font.seek(table_start, 0)
+                raw = bytearray(group_num * 4)
+                self.font.readinto(raw)
+                self.group_offsets = array("I", raw)
+                del raw
+                self.length_table = table_start + group_num * 4
+                self.glyph_lengths = None
+                if self.font_data is not None:
+                    self.glyph_lengths = self.font_data[self.length_table : self.length_table + word_num]
+                elif enable_mem_index:
+                    self.glyph_lengths = bytearray(word_num)
+                    self.font.readinto(self.glyph_lengths)
+                table_start = (self.length_table + word_num + 3) & ~3
+            if self.flags & _FLAG_METRICS:
+                self.metrics_table = table_start
+
+            # 查询字体空间范围
+            last = self.run_num - 1
+            self.font_begin = self._run_field(0)
+            self.font_end = self._run_field(last) + self._run_field(self.run_num + last) - 1
+        self.word_num = word_num
+
+        # 字符度量表，内存充足时载入内存
+        self.has_metrics = bool(self.flags & _FLAG_METRICS)
+        self.glyph_metrics = None
+        if self.has_metrics:
+            if self.font_data is not None:
+                self.glyph_metrics = self.font_data[
+                    self.metrics_table : self.metrics_table + word_num * 2
+                ]
+            elif enable_mem_index or load_into_mem:
+                self.glyph_metrics = bytearray(word_num * 2)
+                self.font.seek(self.metrics_table, 0)
+                self.font.readinto(self.glyph_metrics)
+        # 按墨迹宽度复用的 FrameBuffer
+        self._ink_framebufs = {}
+
+        # 缺失字符：替代点阵、最近缺失的码点、计数
+        #   替代点阵为码点时在第一次遇到缺失字符时才读取
+        self._missing_glyph_code = None
+        self.missing_glyph = None
+        if isinstance(missing_glyph, int):
+            self._missing_glyph_code = missing_glyph
+        elif missing_glyph is not None:
+            if len(missing_glyph) != self.bitmap_size:
+                raise ValueError("替代点阵长度应为 " + str(self.bitmap_size))
+            self.missing_glyph = bytes(missing_glyph)
+        self._missing_codes = set()
+        self.missing_count = 0
+        self.missing_cache_hits = 0
+        self.reset_stats()
 
         # 点阵数据缓存
         if enable_bitmap_cache:
@@ -480,66 +2241,331 @@ class BMFont:
         else:
             self.bitmap_cache = None
 
+        # 缓冲区中的字体本身就可以直接访问，不需要载入内存、缓存与元数据文件，索引直接使用缓冲区
+        if self.font_data is not None:
+            load_into_mem = packed_mem = meta_cache = False
+            enable_mem_index = True
+            glyph_cache_size = 0
+
+        # 放缩后点阵的 LRU 缓存，与字体存储方式无关
+        self.scaled_cache = GlyphCache(scaled_cache_size) if scaled_cache_size > 0 else None
+        # 按页排列的点阵缓存，显示对象的 format 为 MONO_VLSB 时使用
+        self.vlsb_cache = GlyphCache(vlsb_cache_size) if vlsb_cache_size > 0 else None
+        # 展开为 RGB565 的点阵缓存，颜色组合 -> 序号
+        self.rgb565_cache = (
+            GlyphCache(rgb565_cache_size) if rgb565_cache_size > 0 else None
+        )
+        self._rgb565_pairs = {}
+
+        # 字符点阵 LRU 缓存
+        self.glyph_cache = (
+            GlyphCache(glyph_cache_size)
+            if glyph_cache_size > 0 and not load_into_mem
+            else None
+        )
+
         # 全部数据载入内存
         self.font.seek(_HEADER_LEN, 0)
         self.load_into_mem = load_into_mem
+        self.meta_file = font_file + ".meta"
+        self.block_boundary = None
+        self.rank_index = None
+        # v4 字体的区间索引已足够紧凑，不需要分块索引、秩索引与内存索引
+        index_meta = self.version == 3 and (packed_mem or not load_into_mem)
+        # 有新建的表时，全部建好后只写一次元数据文件
+        meta_stale = False
+        if meta_cache and index_meta:
+            self._load_meta()
+            if not rank_index:
+                self.rank_index = None
+        if rank_index and self.rank_index is None and index_meta:
+            self._build_rank_index()
+            meta_stale = True
+        # 分块索引只在按文件查找的 v3 字体中使用
+        if self.version == 3 and not load_into_mem and self.block_boundary is None:
+            self._build_block_boundary()
+            meta_stale = True
+        if meta_cache and meta_stale:
+            self._save_meta()
+        self.font.seek(_HEADER_LEN, 0)
+        self.packed_mem = packed_mem and load_into_mem
+        self.enable_mem_index = self.version == 3 and (
+            (enable_mem_index and not load_into_mem) or self.packed_mem
+        )
+        if self.packed_mem:
+            # 索引保留原始字节，点阵数据在文件中本就是连续的，一次读入即可
+            if self.version == 3:
+                self.font_index_cache = bytearray(self.start_bitmap - _HEADER_LEN)
+                self.font.readinto(self.font_index_cache)
+                gc.collect()
+            self.font_arena = memoryview(bytearray(word_num * self.bitmap_size))
+            if self.compressed:
+                for i in range(word_num):
+                    offset = i * self.bitmap_size
+                    self._read_compressed(i, self.font_arena[offset : offset + self.bitmap_size])
+            else:
+                self.font.seek(self.start_bitmap, 0)
+                self.font.readinto(self.font_arena)
+            gc.collect()
+            return
         if load_into_mem:
             # 存储全部字体数据
             self.all_font_data: dict[int, bytes] = {}
-            for word_index in range(word_num):
-                self.font.seek(_HEADER_LEN + word_index * 2, 0)
-                word_code = struct.unpack(">H", self.font.read(2))[0]
+            # _iter_codes 每次读取前都会重新定位，可以与点阵的读取交替进行
+            for word_index, word_code in enumerate(self._iter_codes()):
+                if self.compressed:
+                    bitmap = bytearray(self.bitmap_size)
+                    self._read_compressed(word_index, bitmap)
+                    self.all_font_data[word_code] = bytes(bitmap)
+                    continue
                 self.font.seek(self.start_bitmap + word_index * self.bitmap_size, 0)
-                data = self.font.read(self.bitmap_size)
-                self.all_font_data[word_code] = data
+                self.all_font_data[word_code] = self.font.read(self.bitmap_size)
+            gc.collect()
+            return
+
+        if self.version == 4:
             gc.collect()
             return
 
         # 建立内存索引
-        self.enable_mem_index = enable_mem_index
-        if enable_mem_index:
-            self.font_index_cache = struct.unpack(
-                f">{word_num}H", self.font.read(self.start_bitmap - _HEADER_LEN)
-            )
+        if self.font_data is not None:
+            self.font_index_cache = self.font_data[_HEADER_LEN : self.start_bitmap]
+        elif enable_mem_index:
+            # 保留原始字节，每个索引只占 2 字节，不会像元组那样为每个整数付出额外开销
+            self.font_index_cache = bytearray(self.start_bitmap - _HEADER_LEN)
+            self.font.readinto(self.font_index_cache)
+        gc.collect()
 
-        # 建立分块索引
-        self.block_boundary: list = [None for _ in range(3)]
-        font = self.font
-        block_num = len(_UNICODE_BLOCK_RANGE)
-        font.seek(_HEADER_LEN, 0)
-        len_ = 1000
-        not_eof = True
-        block = 0
-        find_start = False
-        start, end = 0, 0
-        while not_eof:
-            if len_ + font.tell() > self.start_bitmap:
-                len_ = self.start_bitmap - font.tell()
-                not_eof = False
-            tmp = struct.unpack(f">{len_//2}H", font.read(len_))
-            word_index = 0
-            for word_code in tmp:
-                # 注意：字体文件索引空间是线性的
-                # 第一次满足分块 就记录此时索引为分块起始索引
-                # 直到找到不满足分块的 记录索引为分块结束索引，然后找到其他分块的索引
-                for i, (b, e) in enumerate(_UNICODE_BLOCK_RANGE):
-                    if b <= word_code <= e:
-                        if find_start:
-                            break
-                        else:
-                            block = i
-                            find_start = True
-                            start = font.tell() - len_ + (word_index * 2)
-                            break
-                    elif find_start and i == block:
-                        end = font.tell() - len_ + (word_index * 2)
-                        find_start = False
-                        self.block_boundary[block] = (start, end)
 
-                if block == block_num:
-                    not_eof = False
-                    break
-                word_index += 1
-        if find_start:
-            self.block_boundary[block] = (start, self.start_bitmap)
+class FontChain(BMFont):
+    """
+    按顺序组合多个字体，字符从第一个包含它的字体中获取
+    例如 拉丁字体 + 符号字体 + 中文字体，一次 text() 即可显示混合字符串
+
+    初始化时将除最后一个字体外的所有字体的码点区间合并为一张表(码点区间 -> 字体, 索引)，
+    查询时一次二分即可得到字体和索引，表中没有的字符交给最后一个字体查找，
+    所以码点最多、区间最零散的字体应放在最后。
+    与合并后字号不同的字体，点阵读取后会放缩到统一字号。
+    """
+
+    def __init__(
+        self,
+        fonts: list,
+        font_size: int | None = None,
+        glyph_cache_size=0,
+        scaled_cache_size=0,
+        vlsb_cache_size=0,
+        rgb565_cache_size=0,
+    ):
+        """
+        Args:
+            fonts: BMFont 列表，越靠前优先级越高
+            font_size: 统一的字号，默认与第一个字体相同
+            glyph_cache_size: 所有字体共用的字符点阵 LRU 缓存字节预算，为 0 时不启用，
+                各字体自身的 glyph_cache_size 建议保持为 0，由这里统一分配
+            scaled_cache_size: text() 指定其他字号时，放缩后点阵的 LRU 缓存字节预算
+            vlsb_cache_size: MONO_VLSB 屏幕按页排列的点阵缓存字节预算
+            rgb565_cache_size: RGB565 屏幕按颜色组合展开的点阵缓存字节预算
+        """
+        if not fonts:
+            raise ValueError("至少需要一个字体")
+        self.fonts = fonts
+        self.font_size = fonts[0].font_size if font_size is None else font_size
+        self.bitmap_size = ceildiv(self.font_size, 8) * self.font_size
+        self.bitmap_cache = bytearray(self.bitmap_size)
+        self.font_begin = min(font.font_begin for font in fonts)
+        self.font_end = max(font.font_end for font in fonts)
+        self.has_metrics = any(font.has_metrics for font in fonts)
+        self.packed_mem = False
+        self.load_into_mem = False
+        self._ink_framebufs = {}
+        self.reset_stats()
+        self.glyph_cache = GlyphCache(glyph_cache_size) if glyph_cache_size > 0 else None
+        self.scaled_cache = GlyphCache(scaled_cache_size) if scaled_cache_size > 0 else None
+        self.vlsb_cache = GlyphCache(vlsb_cache_size) if vlsb_cache_size > 0 else None
+        self.rgb565_cache = (
+            GlyphCache(rgb565_cache_size) if rgb565_cache_size > 0 else None
+        )
+        self._rgb565_pairs = {}
+        # 各字体放缩前读取点阵用的缓冲区
+        self._font_buffs = [
+            bytearray(font.bitmap_size) if font.font_size != self.font_size else None
+            for font in fonts
+        ]
+        self._build_chain_index()
+
+    def _build_chain_index(self):
+        """
+        合并各字体的码点区间，重叠部分归属优先级最高的字体
+        结果为按码点排序的互不重叠的区间: 起始码点、结束码点、字体序号、起始码点对应的索引
+        """
+        runs = []
+        for font_id, font in enumerate(self.fonts[:-1]):
+            for begin, length, first in font._iter_runs():
+                runs.append((begin, begin + length - 1, font_id, first))
+        runs.sort()
+
+        # 以所有区间的端点切分码点空间，每一段取覆盖它的优先级最高的字体
+        points = set()
+        for begin, end, _, _ in runs:
+            points.add(begin)
+            points.add(end + 1)
+        points = sorted(points)
+        segments = []
+        active = []
+        i = 0
+        for k in range(len(points) - 1):
+            point = points[k]
+            while i < len(runs) and runs[i][0] <= point:
+                active.append(runs[i])
+                i += 1
+            active = [run for run in active if run[1] >= point]
+            if not active:
+                continue
+            run = active[0]
+            for other in active:
+                if other[2] < run[2]:
+                    run = other
+            base = run[3] + point - run[0]
+            # 与上一段属于同一字体且索引连续时直接延长
+            if segments:
+                last = segments[-1]
+                if (
+                    last[2] == run[2]
+                    and last[1] + 1 == point
+                    and last[3] + point - last[0] == base
+                ):
+                    segments[-1] = (last[0], points[k + 1] - 1, last[2], last[3])
+                    continue
+            segments.append((point, points[k + 1] - 1, run[2], base))
+        del runs, points, active
+
+        self.chain_starts = array("H", (segment[0] for segment in segments))
+        self.chain_ends = array("H", (segment[1] for segment in segments))
+        self.chain_fonts = bytearray(segment[2] for segment in segments)
+        self.chain_bases = array("H", (segment[3] for segment in segments))
         gc.collect()
+
+    def _lookup(self, code: int):
+        """
+        查询字符所在的字体与索引
+
+        Returns:
+            (字体序号, 索引)，合并表中没有时交给最后一个字体查找，仍未找到时索引为 -1
+        """
+        starts = self.chain_starts
+        start = 0
+        end = len(starts) - 1
+        while start < end:
+            mid = (start + end + 1) >> 1
+            if starts[mid] <= code:
+                start = mid
+            else:
+                end = mid - 1
+        if end >= 0 and starts[start] <= code <= self.chain_ends[start]:
+            return self.chain_fonts[start], self.chain_bases[start] + code - starts[start]
+        font_id = len(self.fonts) - 1
+        font = self.fonts[font_id]
+        if code in font._missing_codes:
+            return font_id, -1
+        if font.load_into_mem and not font.packed_mem:
+            return font_id, 0 if code in font.all_font_data else -1
+        return font_id, font._fast_get_index(code)
+
+    def _fit(self, font_id: int, bitmap, buff: bytearray):
+        """将字体原生字号的点阵放缩到统一字号，字号相同时原样返回"""
+        font = self.fonts[font_id]
+        if font.font_size == self.font_size:
+            return bitmap
+        return self._fast_bitmap_resize(bitmap, self.font_size, font.font_size, buff)
+
+    def fast_get_bitmap(self, code: int, buff: bytearray):
+        """获取点阵数据，参数与返回值同 BMFont.fast_get_bitmap"""
+        glyph_cache = self.glyph_cache
+        if glyph_cache is not None:
+            bitmap = glyph_cache.get(code)
+            if bitmap is not None:
+                buff[:] = bitmap
+                return buff
+
+        if _PROFILE:
+            t = utime.ticks_us()
+        font_id, index = self._lookup(code)
+        if _PROFILE:
+            self._profile(_PHASE_INDEX, t)
+        font = self.fonts[font_id]
+        font_buff = self._font_buffs[font_id]
+        if index == -1:
+            return self._fit(font_id, font.fast_get_bitmap(code, font_buff or buff), buff)
+        if _PROFILE:
+            t = utime.ticks_us()
+        bitmap = font._read_bitmap(code, index, font_buff or buff)
+        if _PROFILE:
+            self._profile(_PHASE_READ, t)
+            t = utime.ticks_us()
+        bitmap = self._fit(font_id, bitmap, buff)
+        if _PROFILE and font_buff is not None:
+            self._profile(_PHASE_RESIZE, t)
+        # 已在内存中的原生字号点阵不需要再缓存
+        if glyph_cache is not None and (
+            font_buff is not None or not (font.load_into_mem or font.font_data is not None)
+        ):
+            glyph_cache.put(code, bytes(bitmap))
+        return bitmap
+
+    def fetch_bitmaps(self, string: str) -> dict:
+        """
+        先查询共用的 LRU 缓存，未命中的字符按字体分组后分别批量获取点阵
+        参数与返回值同 BMFont.fetch_bitmaps
+        """
+        glyph_cache = self.glyph_cache
+        bitmaps = {}
+        groups = [[] for _ in self.fonts]
+        for code in set(map(ord, string)):
+            if code < _MIN_PRINTABLE_CODE:
+                continue
+            if glyph_cache is not None:
+                bitmap = glyph_cache.get(code)
+                if bitmap is not None:
+                    bitmaps[code] = bitmap
+                    continue
+            groups[self._lookup(code)[0]].append(chr(code))
+        for font_id, chars in enumerate(groups):
+            if not chars:
+                continue
+            font = self.fonts[font_id]
+            resized = font.font_size != self.font_size
+            # 与 fast_get_bitmap 相同，已在内存中的原生字号点阵不需要再缓存
+            cache = glyph_cache is not None and (
+                resized or not (font.load_into_mem or font.font_data is not None)
+            )
+            for code, bitmap in font.fetch_bitmaps("".join(chars)).items():
+                if resized:
+                    bitmap = self._fast_bitmap_resize(bitmap, self.font_size, font.font_size)
+                bitmaps[code] = bitmap
+                if cache:
+                    glyph_cache.put(code, bytes(bitmap))
+        return bitmaps
+
+    def get_metrics(self, code: int):
+        """获取字符度量，按统一字号放缩，字符所在字体不包含度量表时返回 None"""
+        font_id, index = self._lookup(code)
+        font = self.fonts[font_id]
+        if index == -1 or not font.has_metrics:
+            return None
+        metrics = font.get_metrics(code)
+        if metrics is None or font.font_size == self.font_size:
+            return metrics
+        return (
+            ceildiv(metrics[0] * self.font_size, font.font_size),
+            ceildiv(metrics[1] * self.font_size, font.font_size),
+        )
+
+    def missing_stats(self) -> dict:
+        """缺失字符由最后一个字体处理，返回它的统计"""
+        return self.fonts[-1].missing_stats()
+
+    def close_file(self):
+        """关闭所有字体的文件流"""
+        for font in self.fonts:
+            font.close_file()